@@ -0,0 +1,64 @@
+from django.conf import settings
+from django.contrib import admin
+from django.http import FileResponse, Http404
+from django.shortcuts import get_object_or_404
+from django.urls import path, reverse
+from django.utils.html import format_html
+
+from api.models import RequestProfile
+
+
+@admin.register(RequestProfile)
+class RequestProfileAdmin(admin.ModelAdmin):
+    """Административный класс для просмотра профилей запросов."""
+
+    list_display = (
+        'created',
+        'method',
+        'path',
+        'user',
+        'status_code',
+        'duration_ms',
+        'queries',
+        'sql_ms',
+        'trigger',
+        'download'
+    )
+    list_select_related = ('user',)
+    list_filter = ('trigger', 'method', 'status_code')
+    search_fields = ('path', '^user__username')
+    readonly_fields = ('download',)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def get_urls(self):
+        return [
+            path(
+                '<int:pk>/download/',
+                self.admin_site.admin_view(self.download_view),
+                name='api_requestprofile_download'
+            ),
+        ] + super().get_urls()
+
+    @admin.display(description='Файл профиля')
+    def download(self, obj):
+        return format_html(
+            '<a href="{}">{}</a>',
+            reverse('admin:api_requestprofile_download', args=(obj.pk,)),
+            obj.file
+        )
+
+    def download_view(self, request, pk):
+        if not self.has_view_permission(request):
+            raise Http404
+        profile = get_object_or_404(RequestProfile, pk=pk)
+        path = settings.PROFILING_DIR / profile.file
+        if not path.exists():
+            raise Http404
+        return FileResponse(
+            open(path, 'rb'), as_attachment=True, filename=profile.file
+        )
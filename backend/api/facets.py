@@ -0,0 +1,123 @@
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Exists, Model, OuterRef, Q, QuerySet
+from django_filters import utils
+
+from api.filters import RecipeFilter
+from recipes.models import Favorites, Recipe, ShoppingCart, Tag
+
+FACETS_KEY = 'recipe_facets:{}:{}'
+# Верхние границы интервалов времени приготовления в минутах,
+# последний интервал открыт сверху.
+COOKING_TIME_BUCKETS = (15, 30, 60, 120)
+# Параметры, которые не влияют на состав рецептов.
+IGNORED_FILTERS = ('ordering',)
+
+
+def normalize(value):
+    if isinstance(value, Model):
+        return value.pk
+    if isinstance(value, (list, tuple, QuerySet)):
+        return sorted(normalize(item) for item in value)
+    return value
+
+
+def get_filterset(request, exclude=()):
+    data = request.query_params.copy()
+    for name in exclude:
+        data.pop(name, None)
+    filterset = RecipeFilter(
+        data, queryset=Recipe.objects.order_by(), request=request
+    )
+    if not filterset.is_valid():
+        raise utils.translate_validation(filterset.errors)
+    return filterset
+
+
+def facets_key(filterset, user):
+    """Ключ кэша по очищенным значениям фильтра, а не по строке запроса."""
+    state = {
+        name: normalize(value)
+        for name, value in filterset.form.cleaned_data.items()
+        if name not in IGNORED_FILTERS
+    }
+    digest = hashlib.md5(
+        json.dumps(state, sort_keys=True, default=str).encode()
+    ).hexdigest()
+    return FACETS_KEY.format(user.pk if user.is_authenticated else 0, digest)
+
+
+def tag_counts(queryset):
+    """Число рецептов с каждым тегом одним сгруппированным запросом."""
+    return list(Tag.objects.annotate(
+        count=Count('recipes', filter=Q(recipes__in=queryset.values('pk')))
+    ).order_by('pk').values('id', 'name', 'slug', 'count'))
+
+
+def cooking_time_buckets():
+    lower = 1
+    for upper in COOKING_TIME_BUCKETS:
+        yield lower, upper
+        lower = upper + 1
+    yield lower, None
+
+
+def recipe_counts(queryset, user):
+    """
+    Общее число рецептов, гистограмма времени приготовления
+    и число рецептов в избранном и списке покупок пользователя
+    одним агрегирующим запросом.
+    """
+    buckets = list(cooking_time_buckets())
+    aggregates = {'count': Count('pk')}
+    for index, (lower, upper) in enumerate(buckets):
+        condition = Q(cooking_time__gte=lower)
+        if upper is not None:
+            condition &= Q(cooking_time__lte=upper)
+        aggregates[f'bucket_{index}'] = Count('pk', filter=condition)
+    if user.is_authenticated:
+        for name, model in (('is_favorited', Favorites),
+                            ('is_in_shopping_cart', ShoppingCart)):
+            aggregates[name] = Count('pk', filter=Q(Exists(
+                model.objects.filter(user=user, recipe=OuterRef('pk'))
+            )))
+    # Фильтр по тегам добавляет JOIN и DISTINCT, поэтому агрегируем
+    # по id отфильтрованных рецептов.
+    counts = Recipe.objects.filter(
+        pk__in=queryset.values('pk')
+    ).aggregate(**aggregates)
+    return {
+        'count': counts['count'],
+        'cooking_time': [
+            {
+                'min': lower,
+                'max': upper,
+                'count': counts[f'bucket_{index}'],
+            }
+            for index, (lower, upper) in enumerate(buckets)
+        ],
+        'is_favorited': counts.get('is_favorited', 0),
+        'is_in_shopping_cart': counts.get('is_in_shopping_cart', 0),
+    }
+
+
+def get_facets(request):
+    """
+    Счётчики для панели фильтров при текущих параметрах RecipeFilter.
+    Счётчики тегов считаются без фильтра по тегам: теги объединяются
+    через ИЛИ, и счётчик показывает, сколько рецептов даст каждый тег.
+    Результат кэшируется на FACETS_TTL секунд.
+    """
+    filterset = get_filterset(request)
+    key = facets_key(filterset, request.user)
+    facets = cache.get(key)
+    if facets is None:
+        facets = recipe_counts(filterset.qs, request.user)
+        facets['tags'] = tag_counts(
+            get_filterset(request, exclude=('tags',)).qs
+        )
+        cache.set(key, facets, timeout=settings.FACETS_TTL)
+    return facets
@@ -1,12 +1,30 @@
+from functools import reduce
+from operator import add, and_, or_
+
+from django.contrib.auth import get_user_model
+from django.db.models import Case, IntegerField, Q, Value, When
 from django_filters.rest_framework import (FilterSet, filters)
 
-from recipes.models import Tag, Recipe, Ingredient
+from recipes.models import RECIPE_ORDERINGS, Tag, Recipe, Ingredient
+
+UserModel = get_user_model()
+
+USER_SEARCH_FIELDS = ('username', 'first_name', 'last_name')
+# Слова короче ищутся только по началу полей: для подстроки
+# из одного-двух символов триграммный индекс не используется.
+USER_SEARCH_SUBSTRING_MIN_LENGTH = 3
+USER_SEARCH_MAX_WORDS = 3
+# Сколько лучших по рангу совпадений попадает в выдачу: короткое
+# слово или частое имя совпадают с большей частью таблицы.
+USER_SEARCH_MAX_MATCHES = 500
 
 
 class RecipeFilter(FilterSet):
     """
     Фильтр для рецептов, позволяющий фильтровать
-    по тегам, избранному, списку покупок и автору.
+    по тегам, избранному, списку покупок и автору
+    и сортировать по дате, названию, времени приготовления, популярности
+    и популярности за последнее время (trending).
     """
     tags = filters.ModelMultipleChoiceFilter(
         queryset=Tag.objects.all(),
@@ -17,10 +35,15 @@ class RecipeFilter(FilterSet):
     is_in_shopping_cart = filters.BooleanFilter(
         method='filter_by_shopping_cart'
     )
+    ordering = filters.ChoiceFilter(
+        choices=[(ordering, ordering) for ordering in RECIPE_ORDERINGS],
+        method='order_recipes'
+    )
 
     class Meta:
         model = Recipe
-        fields = ('tags', 'is_favorited', 'is_in_shopping_cart', 'author')
+        fields = ('tags', 'is_favorited', 'is_in_shopping_cart', 'author',
+                  'ordering')
 
     def filter_by_favorited(self, queryset, name, value):
         user = self.request.user
@@ -34,6 +57,9 @@ class RecipeFilter(FilterSet):
             return queryset.filter(shoppingcartrecipes__user=user)
         return queryset
 
+    def order_recipes(self, queryset, name, value):
+        return queryset.order_by(*RECIPE_ORDERINGS[value])
+
 
 class IngredientFilter(FilterSet):
     """Фильтр для ингредиентов, позволяющий фильтровать по названию тэгов."""
@@ -43,3 +69,55 @@ class IngredientFilter(FilterSet):
     class Meta:
         model = Ingredient
         fields = ('name',)
+
+
+class UserFilter(FilterSet):
+    """
+    Поиск пользователей по юзернейму, имени и фамилии. Каждое слово
+    запроса должно совпасть с началом или частью одного из полей.
+    Выше в выдаче точное совпадение юзернейма, затем совпадение
+    с началом юзернейма, точное совпадение имени или фамилии,
+    совпадение с их началом и с подстрокой.
+    """
+
+    search = filters.CharFilter(method='search_users')
+
+    class Meta:
+        model = UserModel
+        fields = ('search',)
+
+    @staticmethod
+    def word_match(word, lookup):
+        return reduce(or_, (
+            Q(**{f'{field}__{lookup}': word}) for field in USER_SEARCH_FIELDS
+        ))
+
+    def word_rank(self, word):
+        return Case(
+            When(username__iexact=word, then=Value(0)),
+            When(username__istartswith=word, then=Value(1)),
+            When(self.word_match(word, 'iexact'), then=Value(2)),
+            When(self.word_match(word, 'istartswith'), then=Value(3)),
+            default=Value(4),
+            output_field=IntegerField(),
+        )
+
+    def search_users(self, queryset, name, value):
+        words = value.split()[:USER_SEARCH_MAX_WORDS]
+        if not words:
+            return queryset
+        rank = reduce(add, map(self.word_rank, words))
+        # Совпадения ранжируются и обрезаются в БД: при большом числе
+        # совпадений в выдачу попадают лучшие. id считаются один раз,
+        # чтобы количество и страница не ранжировали их заново.
+        best = list(queryset.filter(reduce(and_, (
+            self.word_match(word, 'icontains')
+            if len(word) >= USER_SEARCH_SUBSTRING_MIN_LENGTH
+            else self.word_match(word, 'istartswith')
+            for word in words
+        ))).annotate(search_rank=rank).order_by(
+            'search_rank', 'username'
+        ).values_list('pk', flat=True)[:USER_SEARCH_MAX_MATCHES])
+        return queryset.filter(pk__in=best).annotate(
+            search_rank=rank
+        ).order_by('search_rank', 'username')
@@ -1,24 +1,168 @@
 import base64
+import binascii
+import io
 
+from django.conf import settings
+from django.core.files.uploadedfile import (InMemoryUploadedFile,
+                                            TemporaryUploadedFile)
+from PIL import Image, UnidentifiedImageError
 from rest_framework import serializers
-from django.core.files.base import ContentFile
+
+DATA_URI_PREFIX = 'data:image/'
+BASE64_MARKER = ';base64,'
+HEADER_MAX_LENGTH = 64
+CHUNK_LENGTH = 64 * 1024
+# Переносы строк и пробелы допустимы в base64 (MIME) и пропускаются.
+WHITESPACE = ' \t\n\r\v\f'
+STRIP_WHITESPACE = str.maketrans('', '', WHITESPACE)
+# Сколько первых байт изображения читать в поисках его заголовка.
+IMAGE_HEADER_LIMIT = 256 * 1024
+FORMATS = {
+    'png': 'PNG',
+    'jpeg': 'JPEG',
+    'jpg': 'JPEG',
+    'gif': 'GIF',
+    'webp': 'WEBP',
+}
+EXTENSIONS = {
+    'PNG': 'png',
+    'JPEG': 'jpg',
+    'GIF': 'gif',
+    'WEBP': 'webp',
+}
+
+
+def decoded_size(data, start):
+    """Размер декодированных данных base64 без их декодирования."""
+    length = len(data) - start - sum(
+        data.count(char, start) for char in WHITESPACE
+    )
+    data = data.rstrip(WHITESPACE)
+    return length // 4 * 3 - data.endswith('=') - data.endswith('==')
+
+
+def image_info(head):
+    """Формат и размеры изображения по его началу или None."""
+    try:
+        with Image.open(io.BytesIO(head)) as image:
+            return image.format, image.size
+    except (UnidentifiedImageError, OSError, SyntaxError):
+        return None
 
 
 class Base64ImageField(serializers.ImageField):
     """
     Поле изображения, которое принимает закодированную
     в Base64 строку изображения.
-    Преобразует строку Base64 в объект ContentFile и
-    сохраняет его в поле изображения.
+    Формат и размер проверяются до декодирования, размеры в пикселях —
+    по заголовку изображения, а расширение файла — по формату,
+    определённому по заголовку, а не по заявленному в строке.
+    Строка декодируется по частям без учёта пробельных символов в файл
+    загрузки: небольшие изображения остаются в памяти, большие
+    записываются во временный файл.
     """
 
+    default_error_messages = {
+        'invalid_base64': 'Некорректное изображение в формате base64.',
+        'unsupported_format': (
+            'Формат изображения {format} не поддерживается. '
+            'Допустимые форматы: {formats}.'
+        ),
+        'too_large': 'Размер изображения не должен превышать {max_size} байт.',
+        'too_many_pixels': (
+            'Изображение {width}×{height} больше допустимых '
+            '{max_side}×{max_side} пикселей.'
+        ),
+    }
+
     def to_internal_value(self, data):
-        if isinstance(data, str) and data.startswith('data:image'):
-            format, imgstr = data.split(';base64,')
-            ext = format.split('/')[-1]
-            data = ContentFile(base64.b64decode(imgstr), name='temp.' + ext)
+        if isinstance(data, str) and data.startswith(DATA_URI_PREFIX):
+            data = self.decode(data)
         return super().to_internal_value(data)
 
+    def decode(self, data):
+        marker = data.find(BASE64_MARKER, 0, HEADER_MAX_LENGTH)
+        if marker == -1:
+            self.fail('invalid_base64')
+        ext = data[len(DATA_URI_PREFIX):marker].lower()
+        if ext not in FORMATS:
+            self.fail(
+                'unsupported_format',
+                format=ext,
+                formats=', '.join(sorted(set(FORMATS.values())))
+            )
+        start = marker + len(BASE64_MARKER)
+        size = decoded_size(data, start)
+        if size > settings.IMAGE_MAX_SIZE:
+            self.fail('too_large', max_size=settings.IMAGE_MAX_SIZE)
+        name = f'image.{ext}'
+        content_type = f'image/{ext}'
+        if size > settings.FILE_UPLOAD_MAX_MEMORY_SIZE:
+            upload = TemporaryUploadedFile(name, content_type, size, None)
+        else:
+            upload = InMemoryUploadedFile(
+                io.BytesIO(), None, name, content_type, size, None
+            )
+        head = b''
+        checked = False
+        # Без пробельных символов кусок может оказаться не кратным 4:
+        # остаток переносится в начало следующего куска.
+        carry = ''
+        for offset in range(start, len(data), CHUNK_LENGTH):
+            encoded = carry + data[
+                offset:offset + CHUNK_LENGTH
+            ].translate(STRIP_WHITESPACE)
+            aligned = len(encoded) - len(encoded) % 4
+            carry = encoded[aligned:]
+            chunk = self.decode_chunk(upload, encoded[:aligned])
+            upload.write(chunk)
+            if not checked and len(head) < IMAGE_HEADER_LIMIT:
+                head += chunk
+                info = image_info(head)
+                if info is not None:
+                    checked = True
+                    self.check_image(upload, *info)
+                    self.rename(upload, ext, info[0])
+        if carry:
+            # Длина base64 с дополнением '=' всегда кратна 4:
+            # остаток означает обрезанную или повреждённую строку.
+            upload.close()
+            self.fail('invalid_base64')
+        upload.seek(0)
+        return upload
+
+    def decode_chunk(self, upload, encoded):
+        try:
+            return base64.b64decode(encoded, validate=True)
+        except binascii.Error:
+            upload.close()
+            self.fail('invalid_base64')
+
+    @staticmethod
+    def rename(upload, ext, image_format):
+        """Расширение и тип файла по настоящему формату изображения."""
+        if FORMATS[ext] == image_format:
+            return
+        upload.name = f'image.{EXTENSIONS[image_format]}'
+        upload.content_type = Image.MIME[image_format]
+
+    def check_image(self, upload, image_format, dimensions):
+        if image_format not in FORMATS.values():
+            upload.close()
+            self.fail(
+                'unsupported_format',
+                format=image_format,
+                formats=', '.join(sorted(set(FORMATS.values())))
+            )
+        width, height = dimensions
+        max_side = settings.IMAGE_MAX_SIDE
+        if width > max_side or height > max_side:
+            upload.close()
+            self.fail(
+                'too_many_pixels', width=width, height=height,
+                max_side=max_side
+            )
+
     def to_representation(self, value):
         if value:
             return value.url
@@ -0,0 +1,368 @@
+import json
+import math
+import random
+import re
+import threading
+import time
+import uuid
+from collections import Counter, defaultdict
+from contextlib import suppress
+from dataclasses import dataclass, field
+
+import requests
+
+SETUP_SCENARIOS = ('register_and_get_tokens', 'tags', 'ingredients', 'recipes')
+CLEANUP_FOLDER = 'delete_requests'
+# Рецепты не удаляются после сценария: на них ссылаются сценарии
+# избранного и списка покупок.
+KEEP_AFTER_SCENARIO = ('recipes',)
+DEFAULT_WEIGHTS = {
+    'users': 2,
+    'tags': 2,
+    'ingredients': 3,
+    'recipes': 1,
+    'subscriptions': 1,
+    'shopping_cart': 1,
+    'favorite': 1,
+    'recipe_filters_for_favorite_and_shopping_cart': 4,
+}
+IDENTITY_VARIABLES = ('username', 'email', 'secondUserUsername',
+                      'secondUserEmail', 'thirdUserUsername', 'thirdUserEmail')
+PERCENTILES = (50, 90, 95, 99)
+
+VARIABLE_RE = re.compile(r'{{(\w+)}}')
+STATUS_RE = re.compile(r'должен быть (\d{3})')
+CONST_RE = re.compile(r'const (\w+) = _\.get\(responseData, "([\w.]+)"\)')
+SET_RE = re.compile(
+    r'collectionVariables\.set\(\s*["\'](\w+)["\'],\s*'
+    r'([\w.\[\]]+(?:\.slice\(\d+,\s*\d+\))?)\s*\)'
+)
+PATH_RE = re.compile(r'\.slice\((\d+),\s*(\d+)\)|\[(\d+)\]|\.(\w+)')
+
+
+@dataclass
+class Step:
+    """Запрос коллекции с ожидаемым статусом и сохраняемыми переменными."""
+
+    endpoint: str
+    method: str
+    url: str
+    headers: dict
+    body: str = None
+    expected: int = None
+    captures: dict = field(default_factory=dict)
+
+
+def folder_name(item):
+    return item['name'].split('//')[0].strip()
+
+
+def parse_path(expression):
+    """
+    Переводит выражение вида [0].name.slice(0,1) в список ключей,
+    индексов и срезов для извлечения значения из ответа.
+    """
+    path = []
+    for start, stop, index, key in PATH_RE.findall(expression):
+        if key:
+            path.append(key)
+        elif index:
+            path.append(int(index))
+        else:
+            path.append(slice(int(start), int(stop)))
+    return path
+
+
+def extract(data, path):
+    for part in path:
+        data = data[part]
+    return data
+
+
+def parse_script(script):
+    """
+    Находит в тестах Postman ожидаемый статус ответа и переменные,
+    которые тест сохраняет из ответа. Поддерживаются только формы,
+    встречающиеся в коллекции проекта.
+    """
+    status = STATUS_RE.search(script)
+    consts = {
+        name: path.split('.') for name, path in CONST_RE.findall(script)
+    }
+    captures = {}
+    for variable, expression in SET_RE.findall(script):
+        if expression in consts:
+            captures[variable] = consts[expression]
+        elif expression.startswith('responseData'):
+            captures[variable] = parse_path(expression[len('responseData'):])
+    return (int(status.group(1)) if status else None), captures
+
+
+def auth_headers(auth):
+    if not auth or auth['type'] != 'apikey':
+        return {}
+    params = {item['key']: item['value'] for item in auth['apikey']}
+    return {params['key']: params['value']}
+
+
+def walk_steps(item, auth=None):
+    auth = item.get('auth', auth)
+    if 'item' in item:
+        for child in item['item']:
+            yield from walk_steps(child, auth)
+        return
+    request = item['request']
+    url = request['url']
+    if isinstance(url, dict):
+        url = url['raw']
+    headers = {
+        header['key']: header['value']
+        for header in request.get('header', ())
+        if not header.get('disabled')
+    }
+    headers.update(auth_headers(request.get('auth', auth)))
+    body = request.get('body', {}).get('raw') or None
+    if body:
+        headers.setdefault('Content-Type', 'application/json')
+    script = '\n'.join(
+        line for event in item.get('event', ())
+        if event['listen'] == 'test'
+        for line in event['script']['exec']
+    )
+    expected, captures = parse_script(script)
+    path = url.replace('{{baseUrl}}', '')
+    yield Step(
+        endpoint=f'{request["method"]} {path}',
+        method=request['method'],
+        url=url,
+        headers=headers,
+        body=body,
+        expected=expected,
+        captures=captures,
+    )
+
+
+def load_collection(path):
+    """
+    Читает Postman-коллекцию и возвращает её переменные и сценарии.
+    Сценарий — папка верхнего уровня; к ней добавляются запросы
+    одноимённой папки из delete_requests, чтобы сценарий можно было
+    повторять.
+    """
+    with open(path, encoding='utf-8') as source:
+        collection = json.load(source)
+    variables = {
+        variable['key']: variable['value']
+        for variable in collection.get('variable', ())
+    }
+    auth = collection.get('auth')
+    folders = {folder_name(item): item for item in collection['item']}
+    cleanup = folders.pop(CLEANUP_FOLDER, {})
+    cleanup_auth = cleanup.get('auth', auth)
+    cleanup = {folder_name(item): item for item in cleanup.get('item', ())}
+    scenarios = {}
+    for name, folder in folders.items():
+        steps = list(walk_steps(folder, auth))
+        if name in cleanup and name not in KEEP_AFTER_SCENARIO:
+            steps.extend(walk_steps(cleanup[name], cleanup_auth))
+        scenarios[name] = steps
+    return variables, scenarios
+
+
+def unique_identity(value, suffix):
+    """Делает имя пользователя или email из коллекции уникальным."""
+    identity = json.loads(value)
+    if '@' in identity:
+        local, domain = identity.split('@', 1)
+        return json.dumps(f'{local}-{suffix}@{domain}')
+    return json.dumps(f'{identity}-{suffix}')
+
+
+class VirtualUser:
+    """
+    Виртуальный пользователь: своя HTTP-сессия и свой набор
+    переменных коллекции с уникальными пользователями.
+    """
+
+    def __init__(self, base_url, variables, suffix, timeout):
+        self.session = requests.Session()
+        self.timeout = timeout
+        self.variables = dict(variables, baseUrl=base_url.rstrip('/'))
+        for name in IDENTITY_VARIABLES:
+            self.variables[name] = unique_identity(
+                self.variables[name], suffix
+            )
+
+    def render(self, text):
+        return VARIABLE_RE.sub(
+            lambda match: str(self.variables.get(match[1], match[0])), text
+        )
+
+    def run(self, step):
+        """Выполняет запрос и возвращает статус ответа и время в секундах."""
+        started = time.perf_counter()
+        try:
+            response = self.session.request(
+                step.method,
+                self.render(step.url),
+                headers={
+                    key: self.render(value)
+                    for key, value in step.headers.items()
+                },
+                data=self.render(step.body).encode() if step.body else None,
+                timeout=self.timeout,
+            )
+        except requests.RequestException:
+            return None, time.perf_counter() - started
+        latency = time.perf_counter() - started
+        if step.captures and response.status_code == step.expected:
+            with suppress(ValueError):
+                data = response.json()
+                for variable, path in step.captures.items():
+                    with suppress(LookupError, TypeError):
+                        self.variables[variable] = extract(data, path)
+        return response.status_code, latency
+
+
+def is_error(step, status):
+    if status is None:
+        return True
+    if step.expected is not None:
+        return status != step.expected
+    return status >= 400
+
+
+def percentile(values, percent):
+    return values[max(0, math.ceil(percent / 100 * len(values)) - 1)]
+
+
+def summarize(latencies, statuses, errors, elapsed):
+    latencies = sorted(latencies)
+    count = len(latencies)
+    summary = {
+        'requests': count,
+        'errors': errors,
+        'error_rate': round(errors / count, 4) if count else 0,
+        'rps': round(count / elapsed, 2) if elapsed else 0,
+        'statuses': {
+            str(code): number for code, number in sorted(
+                statuses.items(), key=lambda item: str(item[0])
+            )
+        },
+    }
+    if latencies:
+        summary['latency_ms'] = {
+            **{
+                f'p{percent}': round(percentile(latencies, percent) * 1000, 2)
+                for percent in PERCENTILES
+            },
+            'mean': round(sum(latencies) / count * 1000, 2),
+            'max': round(latencies[-1] * 1000, 2),
+        }
+    return summary
+
+
+class Report:
+    """Потокобезопасный сбор результатов запросов по эндпоинтам."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.statuses = defaultdict(Counter)
+        self.errors = Counter()
+        self.scenarios = Counter()
+        self.setup_errors = []
+
+    def add(self, step, status, latency):
+        with self.lock:
+            self.latencies[step.endpoint].append(latency)
+            self.statuses[step.endpoint][status or 'error'] += 1
+            self.errors[step.endpoint] += is_error(step, status)
+
+    def as_dict(self, elapsed):
+        total_statuses = Counter()
+        for statuses in self.statuses.values():
+            total_statuses.update(statuses)
+        return {
+            'elapsed': round(elapsed, 2),
+            'scenarios': dict(self.scenarios),
+            'setup_errors': self.setup_errors,
+            'total': summarize(
+                [value for values in self.latencies.values()
+                 for value in values],
+                total_statuses,
+                sum(self.errors.values()),
+                elapsed,
+            ),
+            'endpoints': {
+                endpoint: summarize(
+                    self.latencies[endpoint],
+                    self.statuses[endpoint],
+                    self.errors[endpoint],
+                    elapsed,
+                )
+                for endpoint in sorted(self.latencies)
+            },
+        }
+
+
+def run_load_test(scenarios, variables, base_url, users, duration,
+                  weights, iterations=None, seed=None, timeout=30):
+    """
+    Запускает users виртуальных пользователей. Каждый один раз
+    проходит подготовительные сценарии (регистрация, теги,
+    ингредиенты, рецепты), затем до истечения duration секунд или
+    iterations повторов выбирает сценарии случайно с весами weights.
+    В отчёт попадают только запросы после подготовки.
+    """
+    report = Report()
+    names = [name for name, weight in weights.items() if weight > 0]
+    run_id = uuid.uuid4().hex[:8]
+    clock = {}
+
+    def start_clock():
+        clock['started'] = time.monotonic()
+
+    barrier = threading.Barrier(users, action=start_clock)
+
+    def worker(number):
+        user = VirtualUser(base_url, variables, f'{run_id}-{number}', timeout)
+        failed = None
+        try:
+            for step in (step for name in SETUP_SCENARIOS
+                         for step in scenarios[name]):
+                status, _ = user.run(step)
+                if status is None or (
+                    step.captures and status != step.expected
+                ):
+                    failed = f'{step.endpoint}: {status}'
+                    break
+        except Exception as error:
+            failed = repr(error)
+        barrier.wait()
+        if failed:
+            with report.lock:
+                report.setup_errors.append(failed)
+            return
+        rng = random.Random(None if seed is None else f'{seed}-{number}')
+        deadline = clock['started'] + duration
+        done = 0
+        while time.monotonic() < deadline and (
+            iterations is None or done < iterations
+        ):
+            name = rng.choices(names, [weights[name] for name in names])[0]
+            for step in scenarios[name]:
+                report.add(step, *user.run(step))
+            with report.lock:
+                report.scenarios[name] += 1
+            done += 1
+
+    threads = [
+        threading.Thread(target=worker, args=(number,))
+        for number in range(users)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return report.as_dict(time.monotonic() - clock['started'])
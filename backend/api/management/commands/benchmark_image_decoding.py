@@ -0,0 +1,80 @@
+import base64
+import io
+import math
+import os
+import time
+import tracemalloc
+
+from django.core.files.base import ContentFile
+from django.core.management.base import BaseCommand
+from PIL import Image
+from rest_framework import serializers
+
+from api.image_fields import Base64ImageField
+
+
+def make_data_uri(megabytes):
+    """PNG из шума, который почти не сжимается, в виде data URI."""
+    side = int(math.sqrt(megabytes * 1024 * 1024 / 3))
+    image = Image.frombytes('RGB', (side, side), os.urandom(side * side * 3))
+    buffer = io.BytesIO()
+    image.save(buffer, format='PNG', compress_level=0)
+    return 'data:image/png;base64,' + base64.b64encode(
+        buffer.getvalue()
+    ).decode()
+
+
+def legacy_decode(data):
+    """Прежняя реализация: строка декодируется целиком в память."""
+    format, imgstr = data.split(';base64,')
+    ext = format.split('/')[-1]
+    return serializers.ImageField().to_internal_value(
+        ContentFile(base64.b64decode(imgstr), name='temp.' + ext)
+    )
+
+
+def streaming_decode(data):
+    return Base64ImageField().to_internal_value(data)
+
+
+def measure(decode, data):
+    """Пиковая память Python (МБ), время (мс) и итог декодирования."""
+    tracemalloc.start()
+    started = time.perf_counter()
+    try:
+        decode(data)
+        result = 'ok'
+    except serializers.ValidationError as error:
+        result = f'отклонено: {error.detail[0]}'
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak / 1024 / 1024, elapsed * 1000, result
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает пиковое потребление памяти и время прежнего '
+        'и потокового декодирования изображений base64.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes', type=float, nargs='+', default=(1, 4, 8),
+            help='Размеры изображений в МБ.'
+        )
+
+    def handle(self, *args, **options):
+        for megabytes in options['sizes']:
+            data = make_data_uri(megabytes)
+            self.stdout.write(
+                f'Изображение {megabytes} МБ, строка base64 '
+                f'{len(data) / 1024 / 1024:.1f} МБ:'
+            )
+            for title, decode in (('прежнее', legacy_decode),
+                                  ('потоковое', streaming_decode)):
+                peak, elapsed, result = measure(decode, data)
+                self.stdout.write(
+                    f'  {title:>9}: пик {peak:7.2f} МБ, '
+                    f'{elapsed:8.1f} мс, {result}'
+                )
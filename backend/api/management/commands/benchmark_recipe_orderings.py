@@ -0,0 +1,144 @@
+import json
+import statistics
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from recipes.models import RECIPE_ORDERINGS, Recipe
+
+# Планировщик не может использовать индексы, и сортировка
+# выполняется после полного просмотра таблицы.
+INDEX_SCANS = ('enable_indexscan', 'enable_indexonlyscan', 'enable_bitmapscan')
+FILL_SQL = '''
+INSERT INTO {table} (author_id, name, text, cooking_time, image, pub_date,
+                     favorites_count, trending_score)
+SELECT %s, 'Рецепт ' || md5(number::text), '', 1 + (random() * 180)::int,
+       'recipes/images/benchmark.png',
+       now() - random() * interval '365 days',
+       (random() * random() * 1000)::int, random() * 100
+FROM generate_series(1, %s) AS number
+'''
+
+
+class Rollback(Exception):
+    """Откатывает транзакцию с тестовыми рецептами."""
+
+
+def index_for(ordering):
+    return next(
+        (index.name for index in Recipe._meta.indexes
+         if tuple(index.fields) == ordering),
+        None
+    )
+
+
+def set_index_scans(cursor, enabled):
+    for name in INDEX_SCANS:
+        cursor.execute(f'SET LOCAL {name} = {"on" if enabled else "off"}')
+
+
+def measure(cursor, sql, params, runs):
+    """Медианное время запроса (мс) и его план."""
+    cursor.execute('EXPLAIN ' + sql, params)
+    plan = [row[0] for row in cursor.fetchall()]
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        cursor.execute(sql, params)
+        cursor.fetchall()
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings), plan
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает время выборки страницы рецептов для каждой '
+        'сортировки с составными индексами и без них (PostgreSQL). '
+        'Тестовые рецепты (--fill) добавляются в транзакции, которая '
+        'откатывается после замеров.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--fill', type=int, default=0,
+            help='Сколько тестовых рецептов добавить перед замерами.'
+        )
+        parser.add_argument(
+            '--offsets', type=int, nargs='+', default=(0, 1000),
+            help='Смещения страниц.'
+        )
+        parser.add_argument('--limit', type=int, default=10)
+        parser.add_argument('--runs', type=int, default=5)
+        parser.add_argument('--output', help='Файл для отчёта в JSON.')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError('Сравнение доступно только для PostgreSQL.')
+        report = {}
+        try:
+            with transaction.atomic():
+                if options['fill']:
+                    self.fill(options['fill'])
+                report = self.compare(options)
+                raise Rollback
+        except Rollback:
+            pass
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump(report, output, ensure_ascii=False, indent=2)
+
+    def fill(self, count):
+        author, _ = get_user_model().objects.get_or_create(
+            email='benchmark-orderings@example.com',
+            defaults={'username': 'benchmark-orderings'}
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(
+                FILL_SQL.format(table=Recipe._meta.db_table),
+                [author.pk, count]
+            )
+            cursor.execute(f'ANALYZE {Recipe._meta.db_table}')
+
+    def compare(self, options):
+        report = {'recipes': Recipe.objects.count(), 'orderings': {}}
+        self.stdout.write(f'Рецептов: {report["recipes"]}')
+        with connection.cursor() as cursor:
+            for name, ordering in RECIPE_ORDERINGS.items():
+                index = index_for(ordering)
+                results = report['orderings'][name] = {}
+                for offset in options['offsets']:
+                    queryset = Recipe.objects.order_by(
+                        *ordering
+                    ).values_list('id', flat=True)[
+                        offset:offset + options['limit']
+                    ]
+                    sql, params = queryset.query.sql_with_params()
+                    set_index_scans(cursor, True)
+                    indexed, plan = measure(
+                        cursor, sql, params, options['runs']
+                    )
+                    set_index_scans(cursor, False)
+                    unindexed, _ = measure(
+                        cursor, sql, params, options['runs']
+                    )
+                    set_index_scans(cursor, True)
+                    result = results[offset] = {
+                        'indexed_ms': round(indexed, 2),
+                        'unindexed_ms': round(unindexed, 2),
+                        'speedup': round(unindexed / indexed, 1),
+                        'uses_index': any(
+                            index and index in line for line in plan
+                        ),
+                    }
+                    used = 'используется' if result['uses_index'] else (
+                        'не используется'
+                    )
+                    self.stdout.write(
+                        f'{name} (смещение {offset}): с индексом '
+                        f'{result["indexed_ms"]} мс, без индекса '
+                        f'{result["unindexed_ms"]} мс, '
+                        f'x{result["speedup"]}, индекс {index} {used}'
+                    )
+        return report
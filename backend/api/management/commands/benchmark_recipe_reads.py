@@ -0,0 +1,104 @@
+import json
+import statistics
+import time
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from api.readers import read_recipes, recipe_rows
+from api.serializers import RecipeReadSerializer
+from api.views import RecipeViewSet
+
+
+def serializer_page(request, limit):
+    """Прежний путь: модели с prefetch и RecipeReadSerializer."""
+    recipes = list(RecipeViewSet.queryset[:limit])
+    return JSONRenderer().render(RecipeReadSerializer(
+        recipes, many=True, context={'request': request}
+    ).data)
+
+
+def documents_page(request, limit):
+    """Строки values() с документами рецептов и read_recipes."""
+    rows = list(recipe_rows(RecipeViewSet.queryset, request)[:limit])
+    return JSONRenderer().render(read_recipes(rows, request))
+
+
+def measure(build, request, limit, runs):
+    """Медианное время (мс) и число запросов к БД на одну страницу."""
+    build(request, limit)
+    timings = []
+    for _ in range(runs):
+        # Флаги рецептов запоминаются на время запроса.
+        request.__dict__.pop('_recipe_flags', None)
+        started = time.perf_counter()
+        build(request, limit)
+        timings.append((time.perf_counter() - started) * 1000)
+    with CaptureQueriesContext(connection) as queries:
+        request.__dict__.pop('_recipe_flags', None)
+        body = build(request, limit)
+    return statistics.median(timings), len(queries), body
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает время сборки страницы списка рецептов через '
+        'RecipeReadSerializer и через read_recipes для анонимного '
+        'и авторизованного пользователя на текущей базе данных.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=10)
+        parser.add_argument('--runs', type=int, default=50)
+        parser.add_argument(
+            '--email',
+            help='Пользователь для авторизованных запросов; '
+                 'по умолчанию первый по id.'
+        )
+        parser.add_argument('--output', help='Файл для отчёта в JSON.')
+
+    def handle(self, *args, **options):
+        users = get_user_model().objects.order_by('pk')
+        if options['email']:
+            users = users.filter(email=options['email'])
+        user = users.first()
+        if user is None:
+            raise CommandError('Пользователь не найден.')
+        report = {}
+        for title, current_user in (('anonymous', AnonymousUser()),
+                                    ('authenticated', user)):
+            request = Request(APIRequestFactory().get('/api/recipes/'))
+            request.user = current_user
+            results = {}
+            bodies = []
+            for name, build in (('serializer', serializer_page),
+                                ('documents', documents_page)):
+                elapsed, queries, body = measure(
+                    build, request, options['limit'], options['runs']
+                )
+                results[name] = {
+                    'ms': round(elapsed, 2), 'queries': queries
+                }
+                bodies.append(json.loads(body))
+            results['speedup'] = round(
+                results['serializer']['ms'] / results['documents']['ms'], 2
+            )
+            results['same_output'] = bodies[0] == bodies[1]
+            report[title] = results
+            self.stdout.write(
+                f'{title}: serializer {results["serializer"]["ms"]} мс '
+                f'({results["serializer"]["queries"]} запросов), '
+                f'documents {results["documents"]["ms"]} мс '
+                f'({results["documents"]["queries"]} запросов), '
+                f'ускорение x{results["speedup"]}, '
+                f'ответы совпадают: {results["same_output"]}'
+            )
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump(report, output, ensure_ascii=False, indent=2)
@@ -0,0 +1,212 @@
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+
+import requests
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.authtoken.models import Token
+
+from api.loadtest import summarize
+from recipes.models import Recipe, ShoppingCart
+
+READ_PATH = '/api/recipes/?limit=6'
+PDF_PATH = '/api/recipes/download_shopping_cart/'
+BENCHMARK_EMAIL = 'benchmark-servers@example.com'
+# Серверы запускаются с настройками проекта без ограничения частоты
+# запросов, иначе скачивание PDF упрётся в throttle_scopes.
+SETTINGS_TEMPLATE = '''from {module} import *  # noqa
+
+THROTTLE_BUCKETS = {{
+    scope: {{'burst': 10 ** 9, 'rate': '{rate}/s'}}
+    for scope in THROTTLE_BUCKETS
+}}
+'''
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def prepare_user(cart_size):
+    """Пользователь с токеном и списком покупок из cart_size рецептов."""
+    user, _ = get_user_model().objects.get_or_create(
+        email=BENCHMARK_EMAIL,
+        defaults={
+            'username': 'benchmark-servers',
+            'first_name': 'Benchmark',
+            'last_name': 'Servers',
+        }
+    )
+    recipes = list(Recipe.objects.order_by('pk')[:cart_size])
+    if not recipes:
+        raise CommandError('В базе нет рецептов для списка покупок.')
+    for recipe in recipes:
+        ShoppingCart.objects.get_or_create(user=user, recipe=recipe)
+    return Token.objects.get_or_create(user=user)[0].key
+
+
+class Server:
+    """gunicorn с конфигурацией проекта в отдельном процессе."""
+
+    def __init__(self, mode, workers, settings_dir):
+        self.port = free_port()
+        self.base_url = f'http://127.0.0.1:{self.port}'
+        env = dict(
+            os.environ,
+            SERVER_MODE=mode,
+            DJANGO_SETTINGS_MODULE='benchmark_settings',
+            PYTHONPATH=os.pathsep.join(filter(None, (
+                settings_dir, str(settings.BASE_DIR),
+                os.environ.get('PYTHONPATH'),
+            ))),
+        )
+        self.process = subprocess.Popen(
+            [sys.executable, '-m', 'gunicorn',
+             '--config', str(settings.BASE_DIR / 'gunicorn.conf.py'),
+             '--bind', f'127.0.0.1:{self.port}',
+             '--workers', str(workers),
+             '--log-level', 'error'],
+            cwd=settings.BASE_DIR, env=env,
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+
+    def wait(self, timeout=30):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                break
+            try:
+                requests.get(self.base_url + '/api/tags/', timeout=1)
+                return
+            except requests.RequestException:
+                time.sleep(0.2)
+        self.stop()
+        raise CommandError(f'Сервер на порту {self.port} не запустился.')
+
+    def stop(self):
+        self.process.terminate()
+        self.process.wait()
+
+
+def run_clients(base_url, token, readers, pdf_clients, duration, timeout):
+    """Параллельное чтение рецептов и скачивание PDF в течение duration."""
+    results = {path: ([], Counter()) for path in (READ_PATH, PDF_PATH)}
+    lock = threading.Lock()
+    deadline = time.monotonic() + duration
+
+    def client(path, headers):
+        session = requests.Session()
+        while time.monotonic() < deadline:
+            started = time.perf_counter()
+            try:
+                status = session.get(
+                    base_url + path, headers=headers, timeout=timeout
+                ).status_code
+            except requests.RequestException:
+                status = None
+            latency = time.perf_counter() - started
+            with lock:
+                results[path][0].append(latency)
+                results[path][1][status or 'error'] += 1
+
+    threads = [
+        threading.Thread(target=client, args=(READ_PATH, {}))
+        for _ in range(readers)
+    ] + [
+        threading.Thread(
+            target=client,
+            args=(PDF_PATH, {'Authorization': f'Token {token}'})
+        )
+        for _ in range(pdf_clients)
+    ]
+    started = time.monotonic()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.monotonic() - started
+    return {
+        path: summarize(
+            latencies, statuses,
+            sum(number for status, number in statuses.items()
+                if status == 'error' or status >= 400),
+            elapsed,
+        )
+        for path, (latencies, statuses) in results.items()
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает пропускную способность gunicorn в режимах WSGI '
+        'и ASGI при одновременном чтении рецептов и генерации PDF. '
+        'Серверы запускаются с gunicorn.conf.py проекта и текущей '
+        'базой данных.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--modes', nargs='+', choices=('wsgi', 'asgi'),
+            default=('wsgi', 'asgi')
+        )
+        parser.add_argument('--workers', type=int, default=1)
+        parser.add_argument(
+            '--readers', type=int, default=8,
+            help='Клиентов, читающих список рецептов.'
+        )
+        parser.add_argument(
+            '--pdf-clients', type=int, default=2,
+            help='Клиентов, скачивающих список покупок в PDF.'
+        )
+        parser.add_argument(
+            '--cart-size', type=int, default=20,
+            help='Рецептов в списке покупок.'
+        )
+        parser.add_argument('--duration', type=float, default=10)
+        parser.add_argument('--timeout', type=float, default=30)
+        parser.add_argument('--output', help='Файл для отчёта в JSON.')
+
+    def handle(self, *args, **options):
+        token = prepare_user(options['cart_size'])
+        report = {}
+        with tempfile.TemporaryDirectory() as settings_dir:
+            with open(os.path.join(settings_dir, 'benchmark_settings.py'),
+                      'w') as module:
+                module.write(SETTINGS_TEMPLATE.format(
+                    module=os.environ['DJANGO_SETTINGS_MODULE'], rate=10 ** 9
+                ))
+            for mode in options['modes']:
+                server = Server(mode, options['workers'], settings_dir)
+                server.wait()
+                try:
+                    report[mode] = run_clients(
+                        server.base_url, token, options['readers'],
+                        options['pdf_clients'], options['duration'],
+                        options['timeout'],
+                    )
+                finally:
+                    server.stop()
+                self.write_summary(mode, report[mode])
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump(report, output, ensure_ascii=False, indent=2)
+
+    def write_summary(self, mode, results):
+        self.stdout.write(f'{mode.upper()}:')
+        for path, summary in results.items():
+            latency = summary.get('latency_ms', {})
+            self.stdout.write(
+                f'  {path}: {summary["rps"]} запросов/с, '
+                f'p50 {latency.get("p50")} мс, p95 {latency.get("p95")} мс, '
+                f'ошибок {summary["errors"]}'
+            )
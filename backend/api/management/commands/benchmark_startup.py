@@ -0,0 +1,135 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+from collections import Counter
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Модули, которые не должны загружаться при запуске воркера. Pillow
+# сюда не входит: его при загрузке моделей импортирует django-colorfield.
+DEFERRED_MODULES = ('reportlab',)
+# Запускается в отдельном интерпретаторе: загружает WSGI-приложение
+# так же, как воркер gunicorn, и выполняет первый запрос.
+PROBE = '''
+import json, sys, time
+from wsgiref.util import setup_testing_defaults
+
+started = time.perf_counter()
+from foodgram.wsgi import application
+booted = time.perf_counter()
+
+from django.db import connections
+
+deferred = sys.argv[3].split(',')
+report = {
+    'boot_ms': (booted - started) * 1000,
+    'db_connected_at_boot': any(
+        connection.connection is not None
+        for connection in connections.all()
+    ),
+    'loaded_at_boot': [name for name in deferred if name in sys.modules],
+}
+environ = {'PATH_INFO': sys.argv[1], 'HTTP_HOST': sys.argv[2]}
+setup_testing_defaults(environ)
+statuses = []
+response = application(
+    environ, lambda status, headers, exc_info=None: statuses.append(status)
+)
+b''.join(response)
+response.close()
+report['first_request_ms'] = (time.perf_counter() - booted) * 1000
+report['status'] = statuses[0]
+report['loaded_after_request'] = [
+    name for name in deferred if name in sys.modules
+]
+print(json.dumps(report))
+'''
+
+
+def parse_importtime(output):
+    """Собственное время импорта в мс по пакетам верхнего уровня."""
+    packages = Counter()
+    for line in output.splitlines():
+        if not line.startswith('import time:') or 'imported package' in line:
+            continue
+        _, own, _, name = line.replace('|', ':').rsplit(':', 3)
+        packages[name.strip().split('.')[0]] += int(own) / 1000
+    return packages
+
+
+class Command(BaseCommand):
+    help = (
+        'Измеряет запуск воркера: время загрузки WSGI-приложения, '
+        'время до первого ответа и время импорта по пакетам '
+        '(python -X importtime). Завершается ошибкой, если превышены '
+        'пороги, при запуске загружен ReportLab или открыто '
+        'соединение с БД.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--path', default='/api/recipes/')
+        parser.add_argument('--runs', type=int, default=5)
+        parser.add_argument('--top', type=int, default=15)
+        parser.add_argument('--max-boot-ms', type=float)
+        parser.add_argument('--max-first-request-ms', type=float)
+        parser.add_argument('--output', help='Файл для отчёта в JSON.')
+
+    def probe(self, path, *flags):
+        host = next(
+            (host.lstrip('.') for host in settings.ALLOWED_HOSTS
+             if host != '*'),
+            'localhost'
+        )
+        result = subprocess.run(
+            [sys.executable, *flags, '-c', PROBE, path, host,
+             ','.join(DEFERRED_MODULES)],
+            cwd=settings.BASE_DIR, env=os.environ, capture_output=True,
+            text=True,
+        )
+        if result.returncode:
+            raise CommandError(result.stderr)
+        return json.loads(result.stdout.splitlines()[-1]), result.stderr
+
+    def handle(self, *args, **options):
+        runs = [self.probe(options['path'])[0]
+                for _ in range(options['runs'])]
+        _, importtime = self.probe(options['path'], '-X', 'importtime')
+        packages = parse_importtime(importtime)
+        report = {
+            'boot_ms': round(statistics.median(
+                run['boot_ms'] for run in runs
+            ), 1),
+            'first_request_ms': round(statistics.median(
+                run['first_request_ms'] for run in runs
+            ), 1),
+            'status': runs[0]['status'],
+            'db_connected_at_boot': runs[0]['db_connected_at_boot'],
+            'loaded_at_boot': runs[0]['loaded_at_boot'],
+            'loaded_after_request': runs[0]['loaded_after_request'],
+            'import_ms': round(sum(packages.values()), 1),
+            'import_ms_by_package': {
+                name: round(ms, 1)
+                for name, ms in packages.most_common(options['top'])
+            },
+        }
+        self.stdout.write(json.dumps(report, ensure_ascii=False, indent=2))
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump(report, output, ensure_ascii=False, indent=2)
+        problems = []
+        if report['loaded_at_boot']:
+            problems.append(
+                'при запуске загружены: '
+                + ', '.join(report['loaded_at_boot'])
+            )
+        if report['db_connected_at_boot']:
+            problems.append('при запуске открыто соединение с БД')
+        for name in ('boot_ms', 'first_request_ms'):
+            limit = options[f'max_{name}']
+            if limit is not None and report[name] > limit:
+                problems.append(f'{name} {report[name]} > {limit}')
+        if problems:
+            raise CommandError('; '.join(problems))
@@ -0,0 +1,151 @@
+import json
+import logging
+import threading
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.core.servers.basehttp import (ThreadedWSGIServer,
+                                          WSGIRequestHandler,
+                                          get_internal_wsgi_application)
+from django.test.utils import override_settings
+
+from api.loadtest import (DEFAULT_WEIGHTS, SETUP_SCENARIOS, load_collection,
+                          run_load_test)
+
+COLLECTION = (settings.BASE_DIR.parent / 'postman-collection'
+              / 'diploma.postman_collection.json')
+
+
+class QuietRequestHandler(WSGIRequestHandler):
+
+    def log_message(self, *args):
+        pass
+
+
+def serve():
+    """
+    Запускает приложение проекта в фоновом потоке на свободном порту.
+    Ожидаемые коллекцией ответы 4xx не пишутся в лог.
+    """
+    logging.getLogger('django.request').setLevel(logging.ERROR)
+    server = ThreadedWSGIServer(('127.0.0.1', 0), QuietRequestHandler)
+    server.set_app(get_internal_wsgi_application())
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def parse_weight(value):
+    name, _, weight = value.partition('=')
+    try:
+        return name, int(weight)
+    except ValueError:
+        raise CommandError(f'Вес сценария задаётся как имя=число: {value}')
+
+
+class Command(BaseCommand):
+    help = (
+        'Нагрузочный тест по сценариям Postman-коллекции. '
+        'Виртуальные пользователи параллельно выполняют папки '
+        'коллекции, выбранные с заданными весами; отчёт по '
+        'эндпоинтам выводится в JSON.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--collection', default=str(COLLECTION))
+        parser.add_argument(
+            '--base-url', default=None,
+            help='Адрес запущенного сервера (по умолчанию baseUrl '
+                 'коллекции).'
+        )
+        parser.add_argument(
+            '--serve', action='store_true',
+            help='Запустить приложение проекта в этом процессе '
+                 'на текущей базе данных.'
+        )
+        parser.add_argument(
+            '--no-throttle', action='store_true',
+            help='Отключить ограничение частоты запросов (только '
+                 'вместе с --serve).'
+        )
+        parser.add_argument('--users', type=int, default=10)
+        parser.add_argument(
+            '--duration', type=float, default=60,
+            help='Длительность замера в секундах.'
+        )
+        parser.add_argument(
+            '--iterations', type=int, default=None,
+            help='Максимум сценариев на пользователя.'
+        )
+        parser.add_argument(
+            '--weight', action='append', type=parse_weight, default=[],
+            metavar='SCENARIO=N',
+            help='Вес сценария, 0 исключает сценарий. Можно повторять.'
+        )
+        parser.add_argument('--seed', default=None)
+        parser.add_argument('--timeout', type=float, default=30)
+        parser.add_argument('--output', help='Файл для отчёта.')
+
+    def handle(self, *args, **options):
+        if options['users'] < 1:
+            raise CommandError('Нужен хотя бы один виртуальный пользователь')
+        if options['no_throttle'] and not options['serve']:
+            raise CommandError('--no-throttle работает только с --serve')
+        variables, scenarios = load_collection(options['collection'])
+        missing = set(SETUP_SCENARIOS) - scenarios.keys()
+        if missing:
+            raise CommandError(
+                f'В коллекции нет папок: {", ".join(sorted(missing))}'
+            )
+        weights = dict(DEFAULT_WEIGHTS, **dict(options['weight']))
+        unknown = weights.keys() - scenarios.keys()
+        if unknown:
+            raise CommandError(
+                f'Неизвестные сценарии: {", ".join(sorted(unknown))}. '
+                f'Доступны: {", ".join(sorted(scenarios))}'
+            )
+        if not any(weight > 0 for weight in weights.values()):
+            raise CommandError('Все сценарии исключены')
+        base_url = options['base_url'] or variables['baseUrl']
+        with ExitStack() as stack:
+            if options['no_throttle']:
+                # Только на время прогона: настройки процесса
+                # после команды остаются прежними.
+                stack.enter_context(override_settings(THROTTLE_BUCKETS={
+                    scope: {'burst': 10 ** 9, 'rate': '1000000/s'}
+                    for scope in settings.THROTTLE_BUCKETS
+                }))
+            if options['serve']:
+                server = serve()
+                stack.callback(server.server_close)
+                stack.callback(server.shutdown)
+                host, port = server.server_address[:2]
+                base_url = f'http://{host}:{port}'
+            report = run_load_test(
+                scenarios, variables, base_url,
+                users=options['users'],
+                duration=options['duration'],
+                weights=weights,
+                iterations=options['iterations'],
+                seed=options['seed'],
+                timeout=options['timeout'],
+            )
+        report = {
+            'base_url': base_url,
+            'users': options['users'],
+            'seed': options['seed'],
+            'weights': weights,
+            **report,
+        }
+        if len(report['setup_errors']) == options['users']:
+            raise CommandError(
+                'Подготовка не удалась ни у одного пользователя: '
+                f'{report["setup_errors"][0]}'
+            )
+        output = json.dumps(report, ensure_ascii=False, indent=2)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as target:
+                target.write(output)
+            self.stdout.write(f'Отчёт сохранён в {options["output"]}')
+        else:
+            self.stdout.write(output)
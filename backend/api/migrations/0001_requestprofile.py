@@ -0,0 +1,39 @@
+# Generated by Django 3.2.3 on 2026-10-19 09:27
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RequestProfile',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created', models.DateTimeField(auto_now_add=True, verbose_name='Дата')),
+                ('method', models.CharField(max_length=8, verbose_name='Метод')),
+                ('path', models.CharField(max_length=2048, verbose_name='Путь')),
+                ('status_code', models.PositiveSmallIntegerField(verbose_name='Статус ответа')),
+                ('trigger', models.CharField(choices=[('header', 'По запросу'), ('sample', 'Выборка')], max_length=8, verbose_name='Причина')),
+                ('duration_ms', models.FloatField(verbose_name='Длительность, мс')),
+                ('queries', models.PositiveIntegerField(verbose_name='SQL-запросов')),
+                ('sql_ms', models.FloatField(verbose_name='Время SQL, мс')),
+                ('sql_summary', models.JSONField(default=list, verbose_name='Самые долгие SQL-запросы')),
+                ('file', models.CharField(max_length=255, verbose_name='Файл профиля')),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='request_profiles', to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+            ],
+            options={
+                'verbose_name': 'профиль запроса',
+                'verbose_name_plural': 'Профили запросов',
+                'ordering': ('-created',),
+            },
+        ),
+    ]
@@ -0,0 +1,40 @@
+from django.conf import settings
+from django.db import models
+
+
+class RequestProfile(models.Model):
+    """Модель профиля выполнения одного запроса к API."""
+
+    HEADER = 'header'
+    SAMPLE = 'sample'
+    TRIGGERS = (
+        (HEADER, 'По запросу'),
+        (SAMPLE, 'Выборка'),
+    )
+
+    created = models.DateTimeField('Дата', auto_now_add=True)
+    method = models.CharField('Метод', max_length=8)
+    path = models.CharField('Путь', max_length=2048)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='request_profiles',
+        verbose_name='Пользователь'
+    )
+    status_code = models.PositiveSmallIntegerField('Статус ответа')
+    trigger = models.CharField('Причина', max_length=8, choices=TRIGGERS)
+    duration_ms = models.FloatField('Длительность, мс')
+    queries = models.PositiveIntegerField('SQL-запросов')
+    sql_ms = models.FloatField('Время SQL, мс')
+    sql_summary = models.JSONField('Самые долгие SQL-запросы', default=list)
+    file = models.CharField('Файл профиля', max_length=255)
+
+    class Meta:
+        ordering = ('-created',)
+        verbose_name = 'профиль запроса'
+        verbose_name_plural = 'Профили запросов'
+
+    def __str__(self):
+        return f'{self.method} {self.path} ({self.duration_ms:.0f} мс)'
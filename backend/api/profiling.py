@@ -0,0 +1,216 @@
+import cProfile
+import logging
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+from rest_framework.exceptions import APIException
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+
+from api.models import RequestProfile
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = 'HTTP_X_PROFILE'
+PROFILE_PARAM = 'profile'
+SQL_SUMMARY_SIZE = 10
+
+
+class QueryRecorder:
+    """Считает SQL-запросы и их время через execute_wrapper."""
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0
+        self.statements = defaultdict(lambda: [0, 0])
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - started
+            self.count += 1
+            self.total += elapsed
+            statement = self.statements[sql]
+            statement[0] += 1
+            statement[1] += elapsed
+
+    def summary(self):
+        """Самые долгие по суммарному времени запросы с числом повторов."""
+        slowest = sorted(
+            self.statements.items(), key=lambda item: item[1][1],
+            reverse=True
+        )[:SQL_SUMMARY_SIZE]
+        return [
+            {'sql': sql, 'count': count, 'ms': round(total * 1000, 2)}
+            for sql, (count, total) in slowest
+        ]
+
+
+class StackSampler:
+    """
+    Сэмплирующий профайлер: фоновый поток периодически снимает
+    стек потока запроса. Результат сохраняется в формате collapsed
+    stacks, который понимают flamegraph.pl и speedscope.
+    """
+
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.thread_id = threading.get_ident()
+        self.stacks = Counter()
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.sample, daemon=True)
+
+    def enable(self):
+        self.thread.start()
+
+    def disable(self):
+        self.stopped.set()
+        self.thread.join()
+
+    def sample(self):
+        while not self.stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(
+                    f'{code.co_name} '
+                    f'({code.co_filename}:{code.co_firstlineno})'
+                )
+                frame = frame.f_back
+            self.stacks[';'.join(reversed(stack))] += 1
+
+    def dump_stats(self, path):
+        with open(path, 'w') as target:
+            for stack, count in self.stacks.items():
+                target.write(f'{stack} {count}\n')
+
+
+PROFILERS = {
+    'cprofile': (cProfile.Profile, '.prof'),
+    'sampling': (StackSampler, '.collapsed'),
+}
+
+
+def prune_profiles():
+    """
+    Удаляет профили старше PROFILING_MAX_AGE и сверх
+    PROFILING_MAX_PROFILES самых новых. Файлы профилей удаляет
+    обработчик post_delete модели RequestProfile.
+    """
+    profiles = RequestProfile.objects.all()
+    expired = profiles.filter(
+        created__lt=timezone.now() - timedelta(
+            seconds=settings.PROFILING_MAX_AGE
+        )
+    )
+    extra = profiles.filter(pk__in=list(profiles.order_by(
+        '-created', '-pk'
+    ).values_list('pk', flat=True)[settings.PROFILING_MAX_PROFILES:]))
+    return (expired | extra).delete()[0]
+
+
+def get_user(request):
+    """
+    Пользователь запроса. Токен проверяется аутентификаторами DRF,
+    так как до вьюсета request.user знает только о сессии.
+    """
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_authenticated:
+        return user
+    try:
+        return Request(request, authenticators=[
+            authenticator()
+            for authenticator in api_settings.DEFAULT_AUTHENTICATION_CLASSES
+        ]).user
+    except APIException:
+        return None
+
+
+class ProfilingMiddleware:
+    """
+    Профилирует запрос, если сотрудник передал заголовок X-Profile
+    или параметр ?profile=, а также случайную долю запросов
+    PROFILING_SAMPLE_RATE. Профиль сохраняется в PROFILING_DIR,
+    сведения о запросе и SQL — в модель RequestProfile.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        trigger = self.get_trigger(request)
+        if trigger is None:
+            return self.get_response(request)
+        return self.profile(request, trigger)
+
+    def get_trigger(self, request):
+        if PROFILE_HEADER in request.META or PROFILE_PARAM in request.GET:
+            user = get_user(request)
+            if user is not None and user.is_staff:
+                return RequestProfile.HEADER
+        if random.random() < settings.PROFILING_SAMPLE_RATE:
+            return RequestProfile.SAMPLE
+        return None
+
+    def profile(self, request, trigger):
+        profiler_class, suffix = PROFILERS[settings.PROFILING_PROFILER]
+        profiler = profiler_class()
+        recorder = QueryRecorder()
+        try:
+            profiler.enable()
+        except ValueError:
+            # В потоке уже работает другой профайлер.
+            return self.get_response(request)
+        started = time.perf_counter()
+        try:
+            with connection.execute_wrapper(recorder):
+                response = self.get_response(request)
+        finally:
+            duration = time.perf_counter() - started
+            profiler.disable()
+        try:
+            self.save(request, response, trigger, profiler, suffix,
+                      recorder, duration)
+        except Exception:
+            logger.exception('Не удалось сохранить профиль %s', request.path)
+        return response
+
+    @staticmethod
+    def save(request, response, trigger, profiler, suffix, recorder,
+             duration):
+        settings.PROFILING_DIR.mkdir(parents=True, exist_ok=True)
+        name = (f'{timezone.now():%Y%m%d-%H%M%S}-'
+                f'{uuid.uuid4().hex[:8]}{suffix}')
+        path = settings.PROFILING_DIR / name
+        profiler.dump_stats(path)
+        user = getattr(request, 'user', None)
+        if user is not None and not user.is_authenticated:
+            user = None
+        try:
+            RequestProfile.objects.create(
+                method=request.method,
+                path=request.get_full_path()[:2048],
+                user=user,
+                status_code=response.status_code,
+                trigger=trigger,
+                duration_ms=round(duration * 1000, 2),
+                queries=recorder.count,
+                sql_ms=round(recorder.total * 1000, 2),
+                sql_summary=recorder.summary(),
+                file=name,
+            )
+        except Exception:
+            path.unlink(missing_ok=True)
+            raise
+        prune_profiles()
@@ -0,0 +1,224 @@
+from collections import defaultdict
+from functools import reduce
+from operator import or_
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Q
+from django.db.models.fields.json import KeyTransform
+
+from api.recipe_flags import get_recipe_flags
+from api.sparse_fields import requested_fields
+from recipes.models import Recipe, RecipeDocument, RecipeIngredient
+from recipes.signals import invalidate_documents
+from users.models import Subscription
+
+UserModel = get_user_model()
+
+RECIPE_FIELDS = ('id', 'author_id', 'name', 'image', 'text', 'cooking_time')
+AUTHOR_FIELDS = ('email', 'id', 'username', 'first_name', 'last_name')
+TAG_FIELDS = ('id', 'name', 'color', 'slug')
+INGREDIENT_FIELDS = ('id', 'name', 'measurement_unit', 'amount')
+READ_FIELDS = (
+    'id', 'tags', 'author', 'ingredients', 'image', 'is_favorited',
+    'is_in_shopping_cart', 'name', 'text', 'cooking_time'
+)
+DOCUMENT_KEYS = ('tags', 'author', 'ingredients', 'image', 'name', 'text',
+                 'cooking_time')
+
+
+def image_url(name):
+    if name:
+        return Recipe._meta.get_field('image').storage.url(name)
+    return None
+
+
+def recipe_rows(queryset, request):
+    """
+    Превращает queryset рецептов в queryset словарей с id рецепта
+    и его документом. Если запрошены не все поля (?fields=, ?omit=),
+    из документа читаются только нужные ключи.
+    """
+    queryset = queryset.select_related(None).prefetch_related(None)
+    fields = requested_fields(request, READ_FIELDS)
+    versions = ('id', 'document_version', 'document__version')
+    if len(fields) == len(READ_FIELDS):
+        return queryset.values(*versions, 'document__data')
+    return queryset.values(*versions, **{
+        f'document_{key}': KeyTransform(key, 'document__data')
+        for key in DOCUMENT_KEYS if key in fields
+    })
+
+
+def _row_document(row):
+    # Документа нет или он собран до последнего изменения рецепта.
+    if row['document__version'] != row['document_version']:
+        return None
+    if 'document__data' in row:
+        return row['document__data']
+    return {
+        key: row[f'document_{key}']
+        for key in DOCUMENT_KEYS if f'document_{key}' in row
+    }
+
+
+def _tags_by_recipe(recipe_ids):
+    tags = defaultdict(list)
+    rows = Recipe.tags.through.objects.filter(
+        recipe_id__in=recipe_ids
+    ).values_list(
+        'recipe_id', 'tag__id', 'tag__name', 'tag__color', 'tag__slug'
+    ).order_by('id')
+    for recipe_id, tag_id, name, color, slug in rows:
+        tags[recipe_id].append(
+            {'id': tag_id, 'name': name, 'color': color, 'slug': slug}
+        )
+    return tags
+
+
+def _ingredients_by_recipe(recipe_ids):
+    ingredients = defaultdict(list)
+    rows = RecipeIngredient.objects.filter(
+        recipe_id__in=recipe_ids
+    ).values_list(
+        'recipe_id', 'ingredient__id', 'ingredient__name',
+        'ingredient__measurement_unit', 'amount'
+    ).order_by('id')
+    for recipe_id, ingredient_id, name, measurement_unit, amount in rows:
+        ingredients[recipe_id].append({
+            'id': ingredient_id,
+            'name': name,
+            'measurement_unit': measurement_unit,
+            'amount': amount,
+        })
+    return ingredients
+
+
+def build_documents(recipe_ids):
+    """
+    Собирает документы рецептов: всё содержимое ответа
+    RecipeReadSerializer, кроме флагов текущего пользователя.
+    Версия документа читается вместе с рецептом, до тегов,
+    ингредиентов и автора: документ не бывает старше своей версии.
+    """
+    recipes = list(Recipe.objects.filter(pk__in=recipe_ids).values(
+        *RECIPE_FIELDS, 'document_version'
+    ))
+    tags = _tags_by_recipe(recipe_ids)
+    ingredients = _ingredients_by_recipe(recipe_ids)
+    authors = {
+        author['id']: author
+        for author in UserModel.objects.filter(
+            id__in={recipe['author_id'] for recipe in recipes}
+        ).values(*AUTHOR_FIELDS)
+    }
+    return {
+        recipe['id']: RecipeDocument(
+            recipe_id=recipe['id'],
+            version=recipe['document_version'],
+            data={
+                'id': recipe['id'],
+                'tags': tags[recipe['id']],
+                'author': authors[recipe['author_id']],
+                'ingredients': ingredients[recipe['id']],
+                'image': image_url(recipe['image']),
+                'name': recipe['name'],
+                'text': recipe['text'],
+                'cooking_time': recipe['cooking_time'],
+            }
+        )
+        for recipe in recipes
+    }
+
+
+@transaction.atomic
+def rebuild_documents(recipe_ids):
+    """
+    Пересобирает и сохраняет документы рецептов под новой версией:
+    документы, которые параллельно собирают читатели, не затрут их.
+    """
+    invalidate_documents(Recipe.objects.filter(pk__in=recipe_ids))
+    documents = build_documents(recipe_ids)
+    RecipeDocument.objects.filter(recipe_id__in=recipe_ids).delete()
+    RecipeDocument.objects.bulk_create(documents.values())
+    return {pk: document.data for pk, document in documents.items()}
+
+
+def _store_documents(documents):
+    """
+    Сохраняет собранные читателем документы, не затирая документы
+    более новых версий.
+    """
+    RecipeDocument.objects.filter(reduce(or_, (
+        Q(recipe_id=pk, version__lt=document.version)
+        for pk, document in documents.items()
+    ))).delete()
+    RecipeDocument.objects.bulk_create(
+        documents.values(), ignore_conflicts=True
+    )
+
+
+def _missing_documents(recipe_ids):
+    """Собирает и сохраняет недостающие и устаревшие документы."""
+    documents = build_documents(recipe_ids)
+    if documents:
+        _store_documents(documents)
+    return {pk: document.data for pk, document in documents.items()}
+
+
+def read_recipes(rows, request):
+    """
+    Собирает JSON рецептов в формате RecipeReadSerializer
+    из документов рецептов и флагов текущего пользователя.
+    Отсутствующие документы собираются и сохраняются на лету.
+    Возвращаются только поля, запрошенные ?fields= и ?omit=;
+    подписки и флаги не запрашиваются, если их поля не нужны.
+    """
+    rows = list(rows)
+    fields = requested_fields(request, READ_FIELDS)
+    documents = [_row_document(row) for row in rows]
+    missing = [row['id'] for row, doc in zip(rows, documents) if doc is None]
+    built = _missing_documents(missing) if missing else {}
+    documents = [
+        doc if doc is not None else built[row['id']]
+        for row, doc in zip(rows, documents)
+    ]
+    subscribed = set()
+    if 'author' in fields and request.user.is_authenticated:
+        subscribed = set(Subscription.objects.filter(
+            user=request.user,
+            subscription_id__in={doc['author']['id'] for doc in documents}
+        ).values_list('subscription_id', flat=True))
+    favorited = in_shopping_cart = frozenset()
+    if 'is_favorited' in fields or 'is_in_shopping_cart' in fields:
+        favorited, in_shopping_cart = get_recipe_flags(request)
+    recipes = []
+    for row, doc in zip(rows, documents):
+        values = {
+            'id': row['id'],
+            'is_favorited': row['id'] in favorited,
+            'is_in_shopping_cart': row['id'] in in_shopping_cart,
+        }
+        recipe = {}
+        for field in fields:
+            if field in values:
+                recipe[field] = values[field]
+            elif field == 'tags':
+                recipe[field] = [
+                    {key: tag[key] for key in TAG_FIELDS}
+                    for tag in doc['tags']
+                ]
+            elif field == 'author':
+                recipe[field] = {
+                    **{key: doc['author'][key] for key in AUTHOR_FIELDS},
+                    'is_subscribed': doc['author']['id'] in subscribed,
+                }
+            elif field == 'ingredients':
+                recipe[field] = [
+                    {key: ingredient[key] for key in INGREDIENT_FIELDS}
+                    for ingredient in doc['ingredients']
+                ]
+            else:
+                recipe[field] = doc[field]
+        recipes.append(recipe)
+    return recipes
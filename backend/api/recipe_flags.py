@@ -0,0 +1,59 @@
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.cache import cache
+
+from recipes.models import Favorites, ShoppingCart
+
+RECIPE_FLAGS_KEY = 'recipe_flags:{}:{}'
+RECIPE_FLAGS_VERSION_KEY = 'recipe_flags_version:{}'
+
+NO_FLAGS = (frozenset(), frozenset())
+
+
+def get_flags_version(user_id):
+    key = RECIPE_FLAGS_VERSION_KEY.format(user_id)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, uuid4().hex, timeout=settings.RECIPE_FLAGS_TTL)
+        version = cache.get(key)
+    return version
+
+
+def get_recipe_flags(request):
+    """
+    Возвращает множества id рецептов из избранного и списка покупок
+    текущего пользователя. Множества берутся из кэша и запоминаются
+    на время запроса.
+    """
+    if not request.user.is_authenticated:
+        return NO_FLAGS
+    flags = getattr(request, '_recipe_flags', None)
+    if flags is not None:
+        return flags
+    # Версия читается до запроса к БД: если изменения зафиксируют
+    # позже, множества сохранятся под устаревшей версией
+    # и больше не будут прочитаны.
+    key = RECIPE_FLAGS_KEY.format(
+        request.user.pk, get_flags_version(request.user.pk)
+    )
+    flags = cache.get(key)
+    if flags is None:
+        flags = (
+            frozenset(Favorites.objects.filter(
+                user=request.user
+            ).values_list('recipe_id', flat=True)),
+            frozenset(ShoppingCart.objects.filter(
+                user=request.user
+            ).values_list('recipe_id', flat=True)),
+        )
+        cache.set(key, flags, timeout=settings.RECIPE_FLAGS_TTL)
+    request._recipe_flags = flags
+    return flags
+
+
+def invalidate_recipe_flags(user_id):
+    cache.set(
+        RECIPE_FLAGS_VERSION_KEY.format(user_id), uuid4().hex,
+        timeout=settings.RECIPE_FLAGS_TTL
+    )
@@ -4,8 +4,12 @@ from rest_framework import serializers
 from rest_framework.validators import UniqueTogetherValidator
 from django.contrib.auth import get_user_model
 from django.db import transaction
+from django.db.models import Prefetch, prefetch_related_objects
 
 from api.image_fields import Base64ImageField
+from api.readers import rebuild_documents
+from api.recipe_flags import get_recipe_flags
+from api.sparse_fields import SparseFieldsMixin, requested_fields
 from users.models import Subscription
 from recipes.models import (Ingredient, Recipe, Favorites, ShoppingCart,
                             RecipeIngredient, Tag)
@@ -13,8 +17,32 @@ from recipes.models import (Ingredient, Recipe, Favorites, ShoppingCart,
 
 UserModel = get_user_model()
 
+RECIPE_INGREDIENTS_PREFETCH = Prefetch(
+    'recipe_ingredient',
+    queryset=RecipeIngredient.objects.select_related('ingredient')
+)
 
-class UserSerializer(serializers.ModelSerializer):
+
+class UserListSerializer(serializers.ListSerializer):
+    """
+    Список пользователей: подписки текущего пользователя на всех
+    пользователей страницы определяются одним запросом.
+    """
+
+    def to_representation(self, data):
+        users = list(data)
+        request = self.context.get('request')
+        self.child.subscribed = set()
+        if ('is_subscribed' in self.child.fields
+                and request and request.user.is_authenticated):
+            self.child.subscribed = set(Subscription.objects.filter(
+                user=request.user,
+                subscription_id__in={user.pk for user in users}
+            ).values_list('subscription_id', flat=True))
+        return super().to_representation(users)
+
+
+class UserSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """Сериализатор модели пользователя."""
 
     is_subscribed = serializers.SerializerMethodField()
@@ -23,8 +51,12 @@ class UserSerializer(serializers.ModelSerializer):
         model = UserModel
         fields = ('email', 'id', 'username', 'first_name',
                   'last_name', 'is_subscribed')
+        list_serializer_class = UserListSerializer
 
     def get_is_subscribed(self, obj):
+        subscribed = getattr(self, 'subscribed', None)
+        if subscribed is not None:
+            return obj.pk in subscribed
         request = self.context.get('request')
         return (request
                 and request.user.is_authenticated
@@ -84,7 +116,7 @@ class PreviewRecipeSerializer(serializers.ModelSerializer):
         fields = ('id', 'name', 'image', 'cooking_time')
 
 
-class RecipeReadSerializer(serializers.ModelSerializer):
+class RecipeReadSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """Сериализатор для чтения рецептов."""
 
     tags = TagSerializer(many=True)
@@ -94,13 +126,21 @@ class RecipeReadSerializer(serializers.ModelSerializer):
         many=True
     )
     image = Base64ImageField(required=True, allow_null=False)
-    is_favorited = serializers.BooleanField(read_only=True, default=False)
-    is_in_shopping_cart = serializers.BooleanField(read_only=True,
-                                                   default=False)
+    is_favorited = serializers.SerializerMethodField()
+    is_in_shopping_cart = serializers.SerializerMethodField()
 
     class Meta:
         model = Recipe
-        exclude = ('pub_date',)
+        exclude = ('pub_date', 'favorites_count', 'trending_score',
+                   'document_version')
+
+    def get_is_favorited(self, obj):
+        favorited, _ = get_recipe_flags(self.context['request'])
+        return obj.pk in favorited
+
+    def get_is_in_shopping_cart(self, obj):
+        _, in_shopping_cart = get_recipe_flags(self.context['request'])
+        return obj.pk in in_shopping_cart
 
 
 class RecipeWriteSerializer(serializers.ModelSerializer):
@@ -114,6 +154,14 @@ class RecipeWriteSerializer(serializers.ModelSerializer):
         exclude = ('pub_date', 'author')
 
     def to_representation(self, instance):
+        lookups = {
+            'tags': 'tags', 'ingredients': RECIPE_INGREDIENTS_PREFETCH
+        }
+        prefetch_related_objects([instance], *(
+            lookups[name] for name in requested_fields(
+                self.context['request'], lookups, validate=False
+            )
+        ))
         return RecipeReadSerializer(
             instance,
             context=self.context
@@ -144,6 +192,7 @@ class RecipeWriteSerializer(serializers.ModelSerializer):
         recipe = Recipe.objects.create(author=author, **validated_data)
         recipe.tags.set(tags)
         self.get_ingredients(recipe, ingredients)
+        rebuild_documents([recipe.pk])
         return recipe
 
     @staticmethod
@@ -162,14 +211,15 @@ class RecipeWriteSerializer(serializers.ModelSerializer):
         instance.tags.set(tags)
         instance.ingredients.clear()
         self.get_ingredients(instance, ingredients)
-        return super().update(instance, validated_data)
+        instance = super().update(instance, validated_data)
+        rebuild_documents([instance.pk])
+        return instance
 
 
 class RecipesOfUserSerializer(UserSerializer):
     """Сериализатор для рецептов пользователя."""
 
     recipes = serializers.SerializerMethodField()
-    recipes_count = serializers.SerializerMethodField()
 
     class Meta:
         model = UserModel
@@ -189,9 +239,6 @@ class RecipesOfUserSerializer(UserSerializer):
             context=self.context)
         return serializer.data
 
-    def get_recipes_count(self, obj):
-        return obj.recipes.count()
-
 
 class FavoriteSerializer(serializers.ModelSerializer):
 
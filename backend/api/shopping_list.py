@@ -0,0 +1,158 @@
+import hashlib
+import hmac
+import io
+import json
+import logging
+from datetime import timedelta
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import transaction
+from django.db.models import Q, Sum
+from django.utils import timezone
+
+from foodgram.background import submit
+from recipes.models import RecipeIngredient, ShoppingListJob
+
+logger = logging.getLogger(__name__)
+
+
+def get_ingredients(user):
+    """Суммирует ингредиенты рецептов из списка покупок пользователя."""
+    return list(RecipeIngredient.objects.filter(
+        recipe__shoppingcartrecipes__user=user
+    ).values(
+        'ingredient__name', 'ingredient__measurement_unit'
+    ).annotate(
+        amount=Sum('amount')
+    ).order_by('ingredient__name', 'ingredient__measurement_unit'))
+
+
+@lru_cache(maxsize=None)
+def pdf_canvas():
+    """
+    Загружает ReportLab и регистрирует шрифт при первой генерации
+    PDF, а не при запуске воркера.
+    """
+    from reportlab.lib.pagesizes import A4
+    from reportlab.pdfbase import pdfmetrics
+    from reportlab.pdfbase.ttfonts import TTFont
+    from reportlab.pdfgen import canvas
+
+    pdfmetrics.registerFont(TTFont('Roboto', 'fonts/Roboto-Regular.ttf'))
+    return canvas.Canvas, A4
+
+
+def render_pdf(ingredients):
+    canvas_class, pagesize = pdf_canvas()
+    buffer = io.BytesIO()
+    p = canvas_class(buffer, pagesize=pagesize)
+    p.setFont('Roboto', 18)
+    p.drawString(220, 800, 'Список покупок')
+    x = 20
+    y = 750
+    for ingredient in ingredients:
+        key = (f'• {ingredient["ingredient__name"]} '
+               f'({ingredient["ingredient__measurement_unit"]})')
+        value = ingredient["amount"]
+        p.drawString(x, y, f'{key} — {value}')
+        y -= 20
+    p.showPage()
+    p.save()
+    return buffer.getvalue()
+
+
+def cart_key(ingredients):
+    """
+    Ключ содержимого списка покупок: одинаковые списки
+    получают один ключ, подобрать ключ без SECRET_KEY нельзя.
+    """
+    payload = json.dumps(ingredients, sort_keys=True, ensure_ascii=False)
+    return hmac.new(
+        settings.SECRET_KEY.encode(), payload.encode(), hashlib.sha256
+    ).hexdigest()
+
+
+def run_job(pk):
+    if not ShoppingListJob.objects.filter(
+        pk=pk, status=ShoppingListJob.PENDING
+    ).update(status=ShoppingListJob.RUNNING, updated=timezone.now()):
+        return
+    job = ShoppingListJob.objects.get(pk=pk)
+    try:
+        pdf = render_pdf(job.ingredients)
+    except Exception:
+        logger.exception('Ошибка формирования списка покупок %s', pk)
+        job.status = ShoppingListJob.FAILED
+        job.save(update_fields=('status', 'updated'))
+        return
+    if job.file:
+        job.file.delete(save=False)
+    job.file.save(f'{job.key}.pdf', ContentFile(pdf), save=False)
+    job.status = ShoppingListJob.DONE
+    job.save(update_fields=('file', 'status', 'updated'))
+
+
+def stuck():
+    """
+    Задачи в очереди или в работе дольше SHOPPING_LIST_JOB_TIMEOUT:
+    пул потоков живёт в процессе воркера, и после его остановки
+    задачу никто не выполнит.
+    """
+    timeout = timezone.now() - timedelta(
+        seconds=settings.SHOPPING_LIST_JOB_TIMEOUT
+    )
+    return Q(
+        status__in=(ShoppingListJob.PENDING, ShoppingListJob.RUNNING),
+        updated__lt=timeout,
+    )
+
+
+def restart(job, condition):
+    """Ставит задачу в очередь заново, если она подходит под condition."""
+    now = timezone.now()
+    if ShoppingListJob.objects.filter(
+        condition, pk=job.pk, updated=job.updated
+    ).update(status=ShoppingListJob.PENDING, updated=now):
+        transaction.on_commit(lambda: submit(run_job, job.pk))
+        job.status = ShoppingListJob.PENDING
+        job.updated = now
+    return job
+
+
+def enqueue(ingredients):
+    """
+    Ставит в очередь формирование PDF и возвращает задачу.
+    Для одинакового содержимого используется одна задача: повторно
+    она запускается, только если завершилась ошибкой, устарела
+    (SHOPPING_LIST_TTL) или зависла (SHOPPING_LIST_JOB_TIMEOUT).
+    """
+    job, created = ShoppingListJob.objects.get_or_create(
+        key=cart_key(ingredients), defaults={'ingredients': ingredients}
+    )
+    if created:
+        transaction.on_commit(lambda: submit(run_job, job.pk))
+        return job
+    expired = timezone.now() - timedelta(seconds=settings.SHOPPING_LIST_TTL)
+    return restart(
+        job,
+        Q(status=ShoppingListJob.FAILED) | Q(updated__lt=expired) | stuck()
+    )
+
+
+def restart_stuck(job):
+    """Перезапускает задачу, зависшую после остановки воркера."""
+    return restart(job, stuck())
+
+
+def expire_jobs():
+    """Удаляет устаревшие задачи вместе с их файлами."""
+    stale = timezone.now() - timedelta(seconds=settings.SHOPPING_LIST_TTL)
+    count = 0
+    for job in ShoppingListJob.objects.filter(updated__lt=stale).iterator():
+        if job.file:
+            job.file.delete(save=False)
+        job.delete()
+        count += 1
+    return count
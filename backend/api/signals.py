@@ -0,0 +1,30 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from api.models import RequestProfile
+from api.recipe_flags import invalidate_recipe_flags
+from api.snapshots import INGREDIENTS_SNAPSHOT, TAGS_SNAPSHOT, bump_version
+from recipes.models import Favorites, Ingredient, ShoppingCart, Tag
+
+
+@receiver((post_save, post_delete), sender=Tag)
+def invalidate_tags_snapshot(sender, **kwargs):
+    bump_version(TAGS_SNAPSHOT)
+
+
+@receiver((post_save, post_delete), sender=Ingredient)
+def invalidate_ingredients_snapshot(sender, **kwargs):
+    bump_version(INGREDIENTS_SNAPSHOT)
+
+
+@receiver((post_save, post_delete), sender=Favorites)
+@receiver((post_save, post_delete), sender=ShoppingCart)
+def invalidate_user_recipe_flags(sender, instance, **kwargs):
+    transaction.on_commit(lambda: invalidate_recipe_flags(instance.user_id))
+
+
+@receiver(post_delete, sender=RequestProfile)
+def delete_profile_file(sender, instance, **kwargs):
+    (settings.PROFILING_DIR / instance.file).unlink(missing_ok=True)
@@ -0,0 +1,85 @@
+import hashlib
+from uuid import uuid4
+
+from django.core.cache import cache
+from django.db import transaction
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.http import parse_etags
+from rest_framework.renderers import JSONRenderer
+
+SNAPSHOT_VERSION_KEY = 'snapshot_version:{}'
+
+TAGS_SNAPSHOT = 'tags'
+INGREDIENTS_SNAPSHOT = 'ingredients'
+
+_snapshots = {}
+
+
+def get_version(name):
+    """
+    Возвращает текущую версию снимка.
+    Версия хранится в общем кэше, чтобы её видели все воркеры.
+    """
+    key = SNAPSHOT_VERSION_KEY.format(name)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, uuid4().hex, timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def bump_version(*names):
+    """
+    Инвалидирует снимки, выставляя им новую версию. Внутри транзакции
+    версия меняется после её фиксации: иначе другой воркер может
+    сохранить под новой версией снимок со старыми данными.
+    """
+    def bump():
+        for name in names:
+            cache.set(
+                SNAPSHOT_VERSION_KEY.format(name), uuid4().hex, timeout=None
+            )
+
+    transaction.on_commit(bump)
+
+
+def get_snapshot(name, queryset, serializer_class):
+    """
+    Возвращает отрендеренный в JSON список объектов и его ETag.
+    В памяти воркера хранится только последняя версия каждого снимка.
+    """
+    version = get_version(name)
+    snapshot = _snapshots.get(name)
+    if snapshot is not None and snapshot[0] == version:
+        return snapshot[1], snapshot[2]
+    body = JSONRenderer().render(
+        serializer_class(queryset, many=True).data
+    )
+    etag = '"{}"'.format(hashlib.md5(body).hexdigest())
+    _snapshots[name] = (version, body, etag)
+    return body, etag
+
+
+class SnapshotListMixin:
+    """
+    Отдаёт нефильтрованный список объектов из заранее
+    отрендеренного снимка вместо сериализации на каждый запрос.
+    """
+
+    snapshot_name = None
+
+    def list(self, request, *args, **kwargs):
+        if (request.query_params
+                or request.accepted_renderer.format != 'json'):
+            return super().list(request, *args, **kwargs)
+        body, etag = get_snapshot(
+            self.snapshot_name,
+            self.get_queryset(),
+            self.get_serializer_class()
+        )
+        if etag in parse_etags(request.headers.get('If-None-Match', '')):
+            response = HttpResponseNotModified()
+        else:
+            response = HttpResponse(body, content_type='application/json')
+        response['ETag'] = etag
+        return response
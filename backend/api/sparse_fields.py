@@ -0,0 +1,62 @@
+from rest_framework import serializers
+
+
+def parse_names(request, param):
+    """Имена полей из параметра запроса (через запятую) или None."""
+    value = request.query_params.get(param)
+    if not value:
+        return None
+    return {name.strip() for name in value.split(',')} - {''}
+
+
+def requested_fields(request, available, validate=True):
+    """
+    Отбирает из available поля, запрошенные параметрами ?fields=
+    и ?omit= (имена через запятую), сохраняя порядок полей.
+    На неизвестные имена отвечает ошибкой 400, иначе опечатка
+    в ?fields= вернула бы пустые объекты. Если available — только
+    часть полей ответа, проверка отключается (validate=False).
+    """
+    fields = parse_names(request, 'fields')
+    omit = parse_names(request, 'omit')
+    if validate:
+        for param, names in (('fields', fields), ('omit', omit)):
+            unknown = (names or set()).difference(available)
+            if unknown:
+                raise serializers.ValidationError({param: [
+                    f'Неизвестные поля: {", ".join(sorted(unknown))}. '
+                    f'Доступные поля: {", ".join(available)}.'
+                ]})
+    selected = list(available)
+    if fields is not None:
+        selected = [name for name in selected if name in fields]
+    if omit is not None:
+        selected = [name for name in selected if name not in omit]
+    return selected
+
+
+class SparseFieldsMixin:
+    """
+    Ограничивает поля сериализатора параметрами ?fields= и ?omit=.
+    Применяется только к корневому сериализатору ответа, вложенные
+    сериализаторы возвращают все свои поля. Исключённые поля
+    не вычисляются, поэтому их запросы к базе не выполняются.
+    Сериализатор, проверяющий входные данные, полей не теряет:
+    параметры не должны сужать набор изменяемых полей.
+    """
+
+    def is_root(self):
+        parent = self.parent
+        if isinstance(parent, serializers.ListSerializer):
+            parent = parent.parent
+        return parent is None
+
+    def get_fields(self):
+        fields = super().get_fields()
+        request = self.context.get('request')
+        if (request is None or not self.is_root()
+                or hasattr(self, 'initial_data')):
+            return fields
+        return {
+            name: fields[name] for name in requested_fields(request, fields)
+        }
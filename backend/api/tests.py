@@ -0,0 +1,794 @@
+import base64
+import io
+import json
+import os
+import random
+import shutil
+import tempfile
+import threading
+import time
+from datetime import timedelta
+from pathlib import Path
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from PIL import Image
+from rest_framework.exceptions import ValidationError
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
+
+from api.image_fields import CHUNK_LENGTH, Base64ImageField
+from api.models import RequestProfile
+from api.readers import (_store_documents, build_documents, read_recipes,
+                         rebuild_documents, recipe_rows)
+from api.recipe_flags import (RECIPE_FLAGS_KEY, get_flags_version,
+                              get_recipe_flags)
+from api.serializers import RecipeReadSerializer
+from api.shopping_list import expire_jobs, run_job
+from api.throttling import ActionTokenBucketThrottle
+from api.views import RecipeViewSet
+from foodgram.settings import RECIPES_BATCH_LIMIT
+from recipes.models import (Favorites, Ingredient, Recipe, RecipeDocument,
+                            RecipeIngredient, ShoppingCart, ShoppingListJob,
+                            Tag)
+from users.models import Subscription
+
+UserModel = get_user_model()
+
+MEDIA_ROOT = tempfile.mkdtemp()
+PNG = base64.b64decode(
+    'iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAADUlEQVR42mNk+M9QDwAD'
+    'hgGAWjR9awAAAABJRU5ErkJggg=='
+)
+LOCMEM_CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}
+}
+
+
+def render(data):
+    """Данные ответа в том виде, в каком их получает клиент."""
+    return json.loads(JSONRenderer().render(data))
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, CACHES=LOCMEM_CACHES)
+class RecipeReadTestCase(TestCase):
+    """Рецепты, авторы, теги и ингредиенты для тестов чтения рецептов."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = [
+            UserModel.objects.create_user(
+                email=f'user{number}@example.com',
+                username=f'user{number}',
+                first_name=f'Имя{number}',
+                last_name=f'Фамилия{number}',
+                password='password',
+            )
+            for number in range(3)
+        ]
+        cls.tags = [
+            Tag.objects.create(
+                name=f'Тег {number}', color=f'#00000{number}',
+                slug=f'tag{number}'
+            )
+            for number in range(3)
+        ]
+        ingredients = [
+            Ingredient.objects.create(
+                name=f'Ингредиент {number}', measurement_unit='г'
+            )
+            for number in range(4)
+        ]
+        cls.recipes = []
+        for number in range(7):
+            recipe = Recipe.objects.create(
+                author=cls.users[number % 3],
+                name=f'Рецепт {number}',
+                text='Описание',
+                cooking_time=number + 1,
+                image=ContentFile(PNG, name='image.png'),
+            )
+            recipe.tags.set(cls.tags[:1 + number % 3])
+            RecipeIngredient.objects.bulk_create(
+                RecipeIngredient(
+                    recipe=recipe, ingredient=ingredient, amount=index + 1
+                )
+                for index, ingredient in enumerate(
+                    ingredients[:1 + number % 4]
+                )
+            )
+            cls.recipes.append(recipe)
+        user = cls.users[0]
+        Favorites.objects.create(user=user, recipe=cls.recipes[1])
+        Favorites.objects.create(user=user, recipe=cls.recipes[4])
+        ShoppingCart.objects.create(user=user, recipe=cls.recipes[2])
+        Subscription.objects.create(user=user, subscription=cls.users[1])
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def client_for(self, user=None):
+        client = APIClient()
+        if user is not None:
+            client.force_authenticate(user)
+        return client
+
+    def drf_request(self, path, user=None):
+        request = Request(APIRequestFactory().get(path))
+        request.user = user or AnonymousUser()
+        return request
+
+    def serialized(self, ids, request):
+        """Рецепты в том виде, в каком их отдаёт RecipeReadSerializer."""
+        recipes = RecipeViewSet.queryset.filter(pk__in=ids).in_bulk()
+        return render(RecipeReadSerializer(
+            [recipes[pk] for pk in ids], many=True,
+            context={'request': request}
+        ).data)
+
+
+class ReadRecipesParityTest(RecipeReadTestCase):
+    """Ответы из read_recipes совпадают с RecipeReadSerializer."""
+
+    def assert_parity(self, path, user=None):
+        response = self.client_for(user).get(path)
+        self.assertEqual(response.status_code, 200)
+        results = response.json()['results']
+        ids = [recipe['id'] for recipe in results]
+        self.assertEqual(
+            results, self.serialized(ids, self.drf_request(path, user))
+        )
+        return results
+
+    def test_read_recipes_matches_serializer(self):
+        for user in (None, self.users[0]):
+            with self.subTest(user=user):
+                request = self.drf_request('/api/recipes/', user)
+                queryset = Recipe.objects.all()
+                self.assertEqual(
+                    render(read_recipes(
+                        recipe_rows(queryset, request), request
+                    )),
+                    self.serialized(
+                        list(queryset.values_list('pk', flat=True)), request
+                    )
+                )
+
+    def test_list_pages(self):
+        for user in (None, self.users[0]):
+            seen = []
+            for page in (1, 2, 3):
+                with self.subTest(user=user, page=page):
+                    seen += self.assert_parity(
+                        f'/api/recipes/?page={page}&limit=3', user
+                    )
+            self.assertEqual(len(seen), len(self.recipes))
+
+    def test_list_filters(self):
+        paths = (
+            f'/api/recipes/?tags={self.tags[1].slug}',
+            f'/api/recipes/?tags={self.tags[0].slug}'
+            f'&tags={self.tags[2].slug}',
+            f'/api/recipes/?author={self.users[1].pk}',
+            '/api/recipes/?is_favorited=1',
+            '/api/recipes/?is_in_shopping_cart=1',
+            '/api/recipes/?ordering=cooking_time',
+        )
+        for user in (None, self.users[0]):
+            for path in paths:
+                with self.subTest(user=user, path=path):
+                    self.assertTrue(self.assert_parity(path, user))
+
+    def test_detail(self):
+        for user in (None, self.users[0]):
+            for recipe in self.recipes[:3]:
+                path = f'/api/recipes/{recipe.pk}/'
+                with self.subTest(user=user, recipe=recipe.pk):
+                    response = self.client_for(user).get(path)
+                    self.assertEqual(
+                        response.json(),
+                        self.serialized(
+                            [recipe.pk], self.drf_request(path, user)
+                        )[0]
+                    )
+
+
+class RecipeQueryCountTest(RecipeReadTestCase):
+    """Число запросов к БД не зависит от количества рецептов."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        rebuild_documents([recipe.pk for recipe in cls.recipes])
+
+    def setUp(self):
+        cache.clear()
+
+    def test_list(self):
+        # Количество, страница; для пользователя ещё подписки,
+        # избранное и список покупок.
+        for user, queries in ((None, 2), (self.users[0], 5)):
+            for limit in (2, len(self.recipes)):
+                cache.clear()
+                with self.subTest(user=user, limit=limit):
+                    with self.assertNumQueries(queries):
+                        self.client_for(user).get(
+                            f'/api/recipes/?limit={limit}'
+                        )
+
+    def test_list_cached_flags(self):
+        client = self.client_for(self.users[0])
+        client.get('/api/recipes/')
+        with self.assertNumQueries(3):
+            client.get('/api/recipes/')
+
+    def test_detail(self):
+        for user, queries in ((None, 1), (self.users[0], 4)):
+            with self.subTest(user=user):
+                with self.assertNumQueries(queries):
+                    self.client_for(user).get(
+                        f'/api/recipes/{self.recipes[0].pk}/'
+                    )
+
+    def test_serializer_prefetch(self):
+        # Рецепты, теги и ингредиенты рецептов вместе с ингредиентами.
+        request = self.drf_request('/api/recipes/')
+        for count in (2, len(self.recipes)):
+            with self.subTest(count=count):
+                with self.assertNumQueries(3):
+                    self.serialized(
+                        [recipe.pk for recipe in self.recipes[:count]],
+                        request
+                    )
+
+
+class RecipeBatchTest(RecipeReadTestCase):
+    """Запрос нескольких рецептов по списку id."""
+
+    def batch(self, ids, user=None):
+        return self.client_for(user).get(f'/api/recipes/batch/?ids={ids}')
+
+    def test_order_and_missing(self):
+        first, second = self.recipes[3].pk, self.recipes[1].pk
+        missing = max(recipe.pk for recipe in self.recipes) + 1
+        for user in (None, self.users[0]):
+            with self.subTest(user=user):
+                response = self.batch(
+                    f'{first},{missing},{second},{first}', user
+                )
+                self.assertEqual(response.status_code, 200)
+                data = response.json()
+                self.assertEqual(
+                    data['results'],
+                    self.serialized([first, second], self.drf_request(
+                        '/api/recipes/batch/', user
+                    ))
+                )
+                self.assertEqual(data['missing'], [missing])
+
+    def test_invalid_ids(self):
+        for ids in ('1,abc', '1;2', f'{self.recipes[0].pk},1.5'):
+            with self.subTest(ids=ids):
+                self.assertEqual(self.batch(ids).status_code, 400)
+
+    def test_limit(self):
+        ids = [recipe.pk for recipe in self.recipes]
+        start = max(ids) + 1
+        ids += range(start, start + RECIPES_BATCH_LIMIT - len(ids))
+        response = self.batch(','.join(map(str, ids)))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            len(response.json()['results']), len(self.recipes)
+        )
+        ids.append(ids[-1] + 1)
+        self.assertEqual(
+            self.batch(','.join(map(str, ids))).status_code, 400
+        )
+
+
+class RecipeFacetsTest(RecipeReadTestCase):
+    """Счётчики панели фильтров при текущих параметрах."""
+
+    def setUp(self):
+        cache.clear()
+
+    def facets(self, query='', user=None):
+        response = self.client_for(user).get(
+            f'/api/recipes/facets/?{query}'
+        )
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def tag_counts(self, facets):
+        return [tag['count'] for tag in facets['tags']]
+
+    def cooking_time_counts(self, facets):
+        return [bucket['count'] for bucket in facets['cooking_time']]
+
+    def test_without_filters(self):
+        Recipe.objects.filter(pk=self.recipes[0].pk).update(cooking_time=45)
+        Recipe.objects.filter(pk=self.recipes[1].pk).update(cooking_time=200)
+        facets = self.facets()
+        self.assertEqual(facets['count'], len(self.recipes))
+        self.assertEqual(self.tag_counts(facets), [7, 4, 2])
+        self.assertEqual(self.cooking_time_counts(facets), [5, 0, 1, 0, 1])
+        self.assertEqual(facets['cooking_time'][-1]['max'], None)
+        self.assertEqual(facets['is_favorited'], 0)
+        self.assertEqual(facets['is_in_shopping_cart'], 0)
+
+    def test_filters(self):
+        user = self.users[0]
+        for query, count, tags, favorited, in_cart in (
+            (f'author={self.users[1].pk}', 2, [2, 2, 0], 2, 0),
+            (f'tags={self.tags[2].slug}', 2, [7, 4, 2], 0, 1),
+            ('is_favorited=1', 2, [2, 2, 0], 2, 0),
+            (f'is_in_shopping_cart=1&tags={self.tags[1].slug}',
+             1, [1, 1, 1], 0, 1),
+        ):
+            with self.subTest(query=query):
+                facets = self.facets(query, user)
+                self.assertEqual(facets['count'], count)
+                self.assertEqual(
+                    self.cooking_time_counts(facets)[0], count
+                )
+                # Теги считаются без фильтра по тегам.
+                self.assertEqual(self.tag_counts(facets), tags)
+                self.assertEqual(facets['is_favorited'], favorited)
+                self.assertEqual(facets['is_in_shopping_cart'], in_cart)
+
+    def test_cache_key_ignores_parameter_order(self):
+        first, second = self.tags[1].slug, self.tags[2].slug
+        facets = self.facets(f'tags={first}&tags={second}&ordering=name')
+        # Остаётся только проверка тегов фильтром.
+        with self.assertNumQueries(1):
+            self.assertEqual(
+                self.facets(f'tags={second}&tags={first}'), facets
+            )
+
+    def test_invalid_filter(self):
+        response = self.client_for().get('/api/recipes/facets/?tags=bogus')
+        self.assertEqual(response.status_code, 400)
+
+
+class SparseFieldsTest(RecipeReadTestCase):
+    """Параметры ?fields= и ?omit=."""
+
+    def test_selected_fields(self):
+        client = self.client_for(self.users[0])
+        for path, keys in (
+            ('/api/recipes/?fields=id,name', ['id', 'name']),
+            ('/api/recipes/?omit=text,tags,ingredients,author', [
+                'id', 'image', 'is_favorited', 'is_in_shopping_cart',
+                'name', 'cooking_time'
+            ]),
+            ('/api/users/?fields=id,username', ['id', 'username']),
+        ):
+            with self.subTest(path=path):
+                response = client.get(path)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(list(response.json()['results'][0]), keys)
+
+    def test_unknown_fields(self):
+        client = self.client_for(self.users[0])
+        for path in (
+            '/api/recipes/?fields=bogus',
+            '/api/recipes/?fields=id,bogus',
+            f'/api/recipes/{self.recipes[0].pk}/?omit=bogus',
+            '/api/users/?fields=bogus',
+            '/api/users/me/?fields=bogus',
+        ):
+            with self.subTest(path=path):
+                self.assertEqual(client.get(path).status_code, 400)
+
+    def test_fields_do_not_narrow_writes(self):
+        user = self.users[2]
+        response = self.client_for(user).patch(
+            '/api/users/me/?fields=id', {'first_name': 'Новое имя'}
+        )
+        self.assertEqual(response.status_code, 200)
+        user.refresh_from_db()
+        self.assertEqual(user.first_name, 'Новое имя')
+
+
+class RecipeDocumentTest(RecipeReadTestCase):
+    """Документ, собранный до изменения рецепта, не читается после него."""
+
+    def detail(self):
+        return self.client_for().get(
+            f'/api/recipes/{self.recipes[0].pk}/'
+        ).json()
+
+    def test_late_reader_does_not_restore_stale_document(self):
+        recipe = self.recipes[0]
+        # Читатель собрал документ до фиксации изменения.
+        stale = build_documents([recipe.pk])
+        RecipeDocument.objects.filter(recipe=recipe).delete()
+        recipe.name = 'Новое название'
+        recipe.save()
+        _store_documents(stale)
+        self.assertEqual(self.detail()['name'], 'Новое название')
+        document = RecipeDocument.objects.get(recipe=recipe)
+        self.assertEqual(document.data['name'], 'Новое название')
+
+    def test_related_changes(self):
+        recipe = self.recipes[0]
+        rebuild_documents([recipe.pk])
+        self.tags[0].name = 'Новый тег'
+        self.tags[0].save()
+        self.assertEqual(self.detail()['tags'][0]['name'], 'Новый тег')
+        ingredient = recipe.ingredients.first()
+        ingredient.name = 'Новый ингредиент'
+        ingredient.save()
+        self.assertEqual(
+            self.detail()['ingredients'][0]['name'], 'Новый ингредиент'
+        )
+        self.users[0].first_name = 'Новое имя'
+        self.users[0].save()
+        self.assertEqual(self.detail()['author']['first_name'], 'Новое имя')
+
+
+class RecipeFlagsTest(RecipeReadTestCase):
+    """Кэш избранного и списка покупок сбрасывается после фиксации."""
+
+    def setUp(self):
+        cache.clear()
+
+    def flags(self):
+        return get_recipe_flags(
+            self.drf_request('/api/recipes/', self.users[0])
+        )
+
+    def test_late_reader_does_not_restore_stale_flags(self):
+        stale = self.flags()
+        user = self.users[0]
+        stale_key = RECIPE_FLAGS_KEY.format(
+            user.pk, get_flags_version(user.pk)
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            Favorites.objects.create(user=user, recipe=self.recipes[0])
+        # Запрос, прочитавший БД до фиксации, сохраняет старые
+        # множества уже после сброса кэша.
+        cache.set(stale_key, stale)
+        self.assertIn(self.recipes[0].pk, self.flags()[0])
+
+    def test_toggles(self):
+        user = self.users[0]
+        client = self.client_for(user)
+        path = f'/api/recipes/{self.recipes[0].pk}/'
+        for action, flag in (('favorite', 'is_favorited'),
+                             ('shopping_cart', 'is_in_shopping_cart')):
+            with self.subTest(action=action):
+                self.assertFalse(client.get(path).json()[flag])
+                with self.captureOnCommitCallbacks(execute=True):
+                    response = client.post(f'{path}{action}/')
+                self.assertEqual(response.status_code, 201)
+                self.assertTrue(client.get(path).json()[flag])
+                with self.captureOnCommitCallbacks(execute=True):
+                    response = client.delete(f'{path}{action}/')
+                self.assertEqual(response.status_code, 204)
+                self.assertFalse(client.get(path).json()[flag])
+
+    def test_invalidated_after_commit(self):
+        user = self.users[0]
+        stale = self.flags()
+        with self.captureOnCommitCallbacks() as callbacks:
+            ShoppingCart.objects.create(user=user, recipe=self.recipes[0])
+        self.assertEqual(self.flags(), stale)
+        for callback in callbacks:
+            callback()
+        self.assertIn(self.recipes[0].pk, self.flags()[1])
+        # Версия флагов других пользователей не меняется.
+        version = get_flags_version(self.users[1].pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            Favorites.objects.create(user=user, recipe=self.recipes[0])
+        self.assertEqual(get_flags_version(self.users[1].pk), version)
+
+
+@mock.patch('api.shopping_list.submit')
+class ShoppingListJobTest(RecipeReadTestCase):
+    """Асинхронное формирование PDF со списком покупок."""
+
+    def setUp(self):
+        cache.clear()
+
+    def download(self, user=None):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client_for(user or self.users[0]).get(
+                '/api/recipes/download_shopping_cart/?async=1'
+            )
+
+    def job(self):
+        return ShoppingListJob.objects.get()
+
+    def age(self, seconds, **fields):
+        ShoppingListJob.objects.update(
+            updated=timezone.now() - timedelta(seconds=seconds), **fields
+        )
+
+    def test_job_lifecycle(self, submit):
+        response = self.download()
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.json(), {'status': 'pending', 'file': None})
+        job = self.job()
+        submit.assert_called_once_with(run_job, job.pk)
+        run_job(job.pk)
+        response = self.client_for(self.users[0]).get(response['Location'])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['status'], 'done')
+        self.assertTrue(response.json()['file'].endswith(f'{job.key}.pdf'))
+        job.refresh_from_db()
+        job.file.delete(save=False)
+
+    def test_same_content_shares_job(self, submit):
+        ShoppingCart.objects.create(user=self.users[1], recipe=self.recipes[2])
+        self.download()
+        self.download(self.users[1])
+        self.assertEqual(ShoppingListJob.objects.count(), 1)
+        submit.assert_called_once()
+
+    def test_failed_job_restarts(self, submit):
+        self.download()
+        with mock.patch('api.shopping_list.render_pdf',
+                        side_effect=ValueError):
+            with self.assertLogs('api.shopping_list', 'ERROR'):
+                run_job(self.job().pk)
+        self.assertEqual(self.job().status, ShoppingListJob.FAILED)
+        response = self.download()
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(self.job().status, ShoppingListJob.PENDING)
+        self.assertEqual(submit.call_count, 2)
+
+    @override_settings(SHOPPING_LIST_JOB_TIMEOUT=60)
+    def test_stuck_job_restarts(self, submit):
+        self.download()
+        job = self.job()
+        url = f'/api/recipes/shopping_cart_jobs/{job.key}/'
+        client = self.client_for(self.users[0])
+        for seconds, restarted in ((30, False), (90, True)):
+            with self.subTest(seconds=seconds):
+                submit.reset_mock()
+                self.age(seconds, status=ShoppingListJob.RUNNING)
+                with self.captureOnCommitCallbacks(execute=True):
+                    response = client.get(url)
+                self.assertEqual(response.status_code, 202)
+                self.assertEqual(submit.called, restarted)
+                self.assertEqual(
+                    self.job().status,
+                    ShoppingListJob.PENDING if restarted
+                    else ShoppingListJob.RUNNING
+                )
+
+    @override_settings(SHOPPING_LIST_TTL=60)
+    def test_expire_jobs(self, submit):
+        self.download()
+        run_job(self.job().pk)
+        path = self.job().file.path
+        self.assertEqual(expire_jobs(), 0)
+        self.age(90)
+        self.assertEqual(expire_jobs(), 1)
+        self.assertFalse(ShoppingListJob.objects.exists())
+        self.assertFalse(os.path.exists(path))
+
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class SlowCache:
+    """Кэш, который медленно читает: гонка становится воспроизводимой."""
+
+    def __init__(self, cache):
+        self.cache = cache
+
+    def get(self, *args, **kwargs):
+        value = self.cache.get(*args, **kwargs)
+        time.sleep(0.01)
+        return value
+
+    def set(self, *args, **kwargs):
+        return self.cache.set(*args, **kwargs)
+
+
+class ThrottledView:
+    action = 'download'
+    throttle_scopes = {'download': 'download'}
+
+
+@override_settings(
+    CACHES=LOCMEM_CACHES,
+    THROTTLE_BUCKETS={'download': {'burst': 3, 'rate': '6/m'}},
+    THROTTLE_LOCKS_DIR=tempfile.mkdtemp(),
+)
+class ActionTokenBucketThrottleTest(TestCase):
+    """Корзина токенов с подменённым временем."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user, cls.other = (
+            UserModel.objects.create_user(
+                email=f'{name}@example.com', username=name,
+                first_name=name, last_name=name, password='password'
+            )
+            for name in ('user', 'other')
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.clock = FakeClock()
+        self.view = ThrottledView()
+
+    def allow(self, user=None, view=None):
+        throttle = ActionTokenBucketThrottle()
+        throttle.timer = self.clock
+        request = Request(APIRequestFactory().get('/'))
+        request.user = user or self.user
+        return throttle.allow_request(request, view or self.view), throttle
+
+    def test_burst_then_reject(self):
+        self.assertEqual(
+            [self.allow()[0] for _ in range(4)], [True, True, True, False]
+        )
+        allowed, throttle = self.allow()
+        self.assertFalse(allowed)
+        self.assertAlmostEqual(throttle.wait(), 10)
+
+    def test_refill(self):
+        for _ in range(3):
+            self.allow()
+        self.clock.now += 9
+        self.assertFalse(self.allow()[0])
+        self.clock.now += 1
+        self.assertTrue(self.allow()[0])
+        self.assertFalse(self.allow()[0])
+
+    def test_refill_is_capped_by_burst(self):
+        self.allow()
+        self.clock.now += 3600
+        self.assertEqual(
+            [self.allow()[0] for _ in range(4)], [True, True, True, False]
+        )
+
+    def test_buckets_per_user(self):
+        for _ in range(3):
+            self.allow()
+        self.assertFalse(self.allow()[0])
+        self.assertTrue(self.allow(self.other)[0])
+
+    def test_action_without_scope(self):
+        view = ThrottledView()
+        view.action = 'list'
+        self.assertTrue(all(self.allow(view=view)[0] for _ in range(10)))
+
+    def test_parallel_requests(self):
+        slow_cache = SlowCache(cache)
+        results = []
+
+        def request():
+            throttle = ActionTokenBucketThrottle()
+            throttle.timer = self.clock
+            throttle.cache = slow_cache
+            drf_request = Request(APIRequestFactory().get('/'))
+            drf_request.user = self.user
+            results.append(throttle.allow_request(drf_request, self.view))
+
+        threads = [threading.Thread(target=request) for _ in range(10)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(results.count(True), 3)
+
+
+@override_settings(
+    CACHES=LOCMEM_CACHES,
+    PROFILING_DIR=Path(tempfile.mkdtemp()),
+    PROFILING_SAMPLE_RATE=1,
+    PROFILING_MAX_PROFILES=2,
+    PROFILING_MAX_AGE=60 * 60,
+)
+class ProfilingRetentionTest(TestCase):
+    """Профили и их файлы не копятся без ограничений."""
+
+    def tearDown(self):
+        shutil.rmtree(settings.PROFILING_DIR, ignore_errors=True)
+
+    def files(self):
+        return sorted(os.listdir(settings.PROFILING_DIR))
+
+    def test_max_profiles(self):
+        for _ in range(4):
+            self.client.get('/api/tags/')
+        self.assertEqual(RequestProfile.objects.count(), 2)
+        self.assertEqual(
+            self.files(),
+            sorted(RequestProfile.objects.values_list('file', flat=True))
+        )
+
+    def test_max_age(self):
+        self.client.get('/api/tags/')
+        RequestProfile.objects.update(
+            created=timezone.now() - timedelta(hours=2)
+        )
+        self.client.get('/api/tags/')
+        self.assertEqual(RequestProfile.objects.count(), 1)
+        self.assertEqual(len(self.files()), 1)
+
+
+class Base64ImageFieldTest(TestCase):
+    """Декодирование изображений из data URI."""
+
+    def decode(self, declared, content, line_length=None):
+        encoded = base64.b64encode(content).decode()
+        if line_length:
+            encoded = '\r\n'.join(
+                encoded[start:start + line_length]
+                for start in range(0, len(encoded), line_length)
+            )
+        upload = Base64ImageField().to_internal_value(
+            f'data:image/{declared};base64,{encoded}'
+        )
+        return upload, upload.read()
+
+    def jpeg(self):
+        buffer = io.BytesIO()
+        Image.new('RGB', (8, 8)).save(buffer, 'JPEG')
+        return buffer.getvalue()
+
+    def test_line_breaks(self):
+        for line_length in (76, 75, 1):
+            with self.subTest(line_length=line_length):
+                upload, content = self.decode('png', PNG, line_length)
+                self.assertEqual(content, PNG)
+                self.assertEqual(upload.name, 'image.png')
+
+    @override_settings(IMAGE_MAX_SIZE=10 * 1024 * 1024)
+    def test_line_breaks_across_chunks(self):
+        # Строки по 77 символов: куски без переносов не кратны 4,
+        # остаток переносится в следующий кусок.
+        buffer = io.BytesIO()
+        Image.frombytes(
+            'RGB', (200, 200), random.Random(0).randbytes(200 * 200 * 3)
+        ).save(buffer, 'PNG')
+        image = buffer.getvalue()
+        upload, content = self.decode('png', image, 77)
+        self.assertGreater(len(image), CHUNK_LENGTH)
+        self.assertEqual(content, image)
+
+    def test_truncated_base64(self):
+        encoded = base64.b64encode(PNG).decode()
+        for tail in (1, 2, 3):
+            with self.subTest(tail=tail):
+                with self.assertRaises(ValidationError):
+                    Base64ImageField().to_internal_value(
+                        'data:image/png;base64,'
+                        + encoded[:-4] + '\n' + encoded[-4:-4 + tail]
+                    )
+
+    def test_extension_from_detected_format(self):
+        jpeg = self.jpeg()
+        upload, content = self.decode('png', jpeg)
+        self.assertEqual(content, jpeg)
+        self.assertEqual(upload.name, 'image.jpg')
+        self.assertEqual(upload.content_type, 'image/jpeg')
+
+    def test_invalid_base64(self):
+        for encoded in ('iVBOR*w0K', 'iVBORw0'):
+            with self.subTest(encoded=encoded):
+                with self.assertRaises(ValidationError):
+                    Base64ImageField().to_internal_value(
+                        f'data:image/png;base64,{encoded}'
+                    )
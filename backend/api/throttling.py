@@ -0,0 +1,82 @@
+import fcntl
+import math
+import os
+import time
+import zlib
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.cache import cache as default_cache
+from rest_framework.throttling import BaseThrottle
+
+DURATIONS = {'s': 1, 'm': 60, 'h': 60 * 60, 'd': 24 * 60 * 60}
+# Корзины распределяются по стольким файлам блокировок.
+LOCK_STRIPES = 64
+
+
+def parse_rate(rate):
+    """Переводит строку вида '30/hour' в количество запросов в секунду."""
+    num, period = rate.split('/')
+    return int(num) / DURATIONS[period[0]]
+
+
+@contextmanager
+def bucket_lock(key):
+    """
+    Блокировка корзины, общая для потоков и воркеров хоста: без неё
+    параллельные запросы читают одно и то же число токенов и все
+    проходят.
+    """
+    os.makedirs(settings.THROTTLE_LOCKS_DIR, exist_ok=True)
+    stripe = zlib.crc32(key.encode()) % LOCK_STRIPES
+    with open(os.path.join(settings.THROTTLE_LOCKS_DIR,
+                           f'{stripe}.lock'), 'a') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        yield
+
+
+class ActionTokenBucketThrottle(BaseThrottle):
+    """
+    Ограничивает частоту запросов по алгоритму token bucket.
+    Область ограничения выбирается по действию вьюсета из
+    атрибута throttle_scopes, действия без области не ограничиваются.
+    Ёмкость корзины (burst) и скорость её пополнения (rate)
+    задаются для каждой области в настройке THROTTLE_BUCKETS.
+    """
+
+    cache = default_cache
+    timer = time.time
+    cache_format = 'throttle_bucket_{scope}_{ident}'
+
+    def __init__(self):
+        self.wait_time = None
+
+    def get_ident(self, request):
+        if request.user.is_authenticated:
+            return f'user_{request.user.pk}'
+        return f'anon_{super().get_ident(request)}'
+
+    def allow_request(self, request, view):
+        scope = getattr(view, 'throttle_scopes', {}).get(view.action)
+        if scope is None:
+            return True
+        bucket = settings.THROTTLE_BUCKETS[scope]
+        burst = bucket['burst']
+        rate = parse_rate(bucket['rate'])
+        key = self.cache_format.format(
+            scope=scope, ident=self.get_ident(request)
+        )
+        with bucket_lock(key):
+            now = self.timer()
+            tokens, updated = self.cache.get(key, (burst, now))
+            tokens = min(burst, tokens + (now - updated) * rate)
+            if tokens < 1:
+                self.wait_time = (1 - tokens) / rate
+                return False
+            self.cache.set(
+                key, (tokens - 1, now), timeout=math.ceil(burst / rate)
+            )
+        return True
+
+    def wait(self):
+        return self.wait_time
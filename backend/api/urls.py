@@ -2,7 +2,7 @@ from django.urls import include, path
 from rest_framework import routers
 
 from api.views import (RecipeViewSet, IngredientViewSet,
-                       TagViewSet, FoodgramUserViewSet)
+                       TagViewSet, FoodgramUserViewSet, DatabasePoolView)
 
 namespace = 'api'
 
@@ -15,4 +15,5 @@ v1_router.register('users', FoodgramUserViewSet, basename='users')
 urlpatterns = [
     path('', include(v1_router.urls)),
     path('auth/', include('djoser.urls.authtoken')),
+    path('metrics/db-pool/', DatabasePoolView.as_view(), name='db-pool'),
 ]
@@ -1,34 +1,42 @@
 import io
-from reportlab.pdfgen import canvas
-from reportlab.pdfbase import pdfmetrics
-from reportlab.pdfbase.ttfonts import TTFont
-from reportlab.lib.pagesizes import A4
+import os
 
 from django.contrib.auth import get_user_model
-from django.db.models import Sum
 from djoser.views import UserViewSet
 from django_filters.rest_framework import DjangoFilterBackend
 from django.shortcuts import get_object_or_404
-from django.http import FileResponse
+from django.http import FileResponse, Http404
 from rest_framework import permissions, status
 from rest_framework.decorators import action
 from rest_framework.viewsets import ModelViewSet, ReadOnlyModelViewSet
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
+from rest_framework.views import APIView
 
-from api.filters import RecipeFilter, IngredientFilter
+from api.facets import get_facets
+from api.filters import IngredientFilter, RecipeFilter, UserFilter
 from api.paginators import FoodgramPageNumberPagination
 from api.permissions import IsAuthorOrReadOnly
+from api.readers import read_recipes, recipe_rows
 from api.serializers import (
+    RECIPE_INGREDIENTS_PREFETCH,
     RecipeReadSerializer, RecipeWriteSerializer,
     UserSerializer,
     TagSerializer, IngredientSerializer,
     RecipesOfUserSerializer, FavoriteSerializer,
     ShoppingCartSerializer, SubscriptionSerializer
 )
+from api.shopping_list import (enqueue, get_ingredients, render_pdf,
+                               restart_stuck)
+from api.snapshots import (INGREDIENTS_SNAPSHOT, TAGS_SNAPSHOT,
+                           SnapshotListMixin)
+from api.throttling import ActionTokenBucketThrottle
+from foodgram.db.pool import pool_stats
+from foodgram.settings import RECIPES_BATCH_LIMIT
 from recipes.models import (Recipe, Tag, Ingredient, Favorites,
-                            ShoppingCart, RecipeIngredient)
+                            ShoppingCart, ShoppingListJob)
 from users.models import Subscription
+from users.purge import start_purge
 
 
 UserModel = get_user_model()
@@ -41,44 +49,90 @@ class RecipeViewSet(ModelViewSet):
 
     queryset = Recipe.objects.all().select_related(
         'author'
-    ).prefetch_related('tags', 'ingredients')
+    ).prefetch_related('tags', RECIPE_INGREDIENTS_PREFETCH)
     pagination_class = FoodgramPageNumberPagination
     permission_classes = (IsAuthorOrReadOnly,)
     filter_backends = (DjangoFilterBackend,)
     filterset_class = RecipeFilter
-    ordering_fields = ('-pub_date', 'name',)
+    lookup_value_regex = r'\d+'
+    throttle_classes = (ActionTokenBucketThrottle,)
+    throttle_scopes = {
+        'create': 'recipe_write',
+        'update': 'recipe_write',
+        'partial_update': 'recipe_write',
+        'download_shopping_cart': 'shopping_cart_download',
+    }
 
-    def get_queryset(self):
-        if self.request.user.is_authenticated:
-            return super().get_queryset().recipe_annotate(self.request.user)
-        return super().get_queryset()
+    def retrieve(self, request, *args, **kwargs):
+        recipes = read_recipes(
+            recipe_rows(
+                self.get_queryset().filter(pk=kwargs['pk']), request
+            ),
+            request
+        )
+        if not recipes:
+            raise Http404
+        return Response(recipes[0])
+
+    def list(self, request, *args, **kwargs):
+        rows = recipe_rows(
+            self.filter_queryset(self.get_queryset()), request
+        )
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(read_recipes(page, request))
+        return Response(read_recipes(rows, request))
+
+    @action(detail=False, methods=('GET',))
+    def batch(self, request):
+        raw_ids = request.query_params.get('ids', '').split(',')
+        try:
+            ids = list(dict.fromkeys(
+                int(pk) for pk in raw_ids if pk.strip()
+            ))
+        except ValueError:
+            return Response(
+                {'ошибка': 'Параметр ids должен содержать id через запятую'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        if len(ids) > RECIPES_BATCH_LIMIT:
+            return Response(
+                {'ошибка': f'Можно запросить не больше '
+                           f'{RECIPES_BATCH_LIMIT} рецептов'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        rows = list(recipe_rows(
+            self.get_queryset().filter(pk__in=ids), request
+        ))
+        recipes = {
+            row['id']: recipe
+            for row, recipe in zip(rows, read_recipes(rows, request))
+        }
+        return Response({
+            'results': [recipes[pk] for pk in ids if pk in recipes],
+            'missing': [pk for pk in ids if pk not in recipes],
+        })
+
+    @action(detail=False, methods=('GET',))
+    def facets(self, request):
+        return Response(get_facets(request))
 
     def get_serializer_class(self):
         if self.action in permissions.SAFE_METHODS:
             return RecipeReadSerializer
         return RecipeWriteSerializer
 
-    @staticmethod
-    def download_file(ingredients):
-        buffer = io.BytesIO()
-        p = canvas.Canvas(buffer, pagesize=A4)
-        pdfmetrics.registerFont(TTFont('Roboto', 'fonts/Roboto-Regular.ttf'))
-        p.setFont('Roboto', 18)
-        p.drawString(220, 800, 'Список покупок')
-        x = 20
-        y = 750
-        for ingredient in ingredients:
-            key = (f'• {ingredient["ingredient__name"]} '
-                   f'({ingredient["ingredient__measurement_unit"]})')
-            value = ingredient["amount"]
-            p.drawString(x, y, f'{key} — {value}')
-            y -= 20
-        p.showPage()
-        p.save()
-        buffer.seek(0)
-        return FileResponse(buffer,
-                            as_attachment=True,
-                            filename='shopping-list.pdf')
+    def job_response(self, job):
+        data = {'status': job.status, 'file': None}
+        if job.status == ShoppingListJob.DONE:
+            data['file'] = self.request.build_absolute_uri(job.file.url)
+        job_url = self.request.build_absolute_uri(
+            self.reverse_action('shopping-cart-job', kwargs={'key': job.key})
+        )
+        if job.status in (ShoppingListJob.PENDING, ShoppingListJob.RUNNING):
+            return Response(data, status=status.HTTP_202_ACCEPTED,
+                            headers={'Location': job_url})
+        return Response(data)
 
     @staticmethod
     def create_new_object(serializer, pk, request):
@@ -126,30 +180,38 @@ class RecipeViewSet(ModelViewSet):
             methods=('GET',),
             permission_classes=(IsAuthenticated,))
     def download_shopping_cart(self, request):
-        ingredients = RecipeIngredient.objects.filter(
-            recipe__shoppingcartrecipes__user=request.user
-        ).values(
-            'ingredient__name', 'ingredient__measurement_unit'
-        ).annotate(
-            amount=Sum('amount')
-        ).order_by('ingredient__name')
+        ingredients = get_ingredients(request.user)
         if not ingredients:
             return Response({'Ошибка': 'Список покупок пуст'},
                             status=status.HTTP_404_NOT_FOUND)
+        if request.query_params.get('async') in ('1', 'true'):
+            return self.job_response(enqueue(ingredients))
+        return FileResponse(io.BytesIO(render_pdf(ingredients)),
+                            as_attachment=True,
+                            filename='shopping-list.pdf')
 
-        return self.download_file(ingredients)
+    @action(detail=False,
+            methods=('GET',),
+            permission_classes=(IsAuthenticated,),
+            url_path=r'shopping_cart_jobs/(?P<key>[0-9a-f]{64})')
+    def shopping_cart_job(self, request, key):
+        return self.job_response(
+            restart_stuck(get_object_or_404(ShoppingListJob, key=key))
+        )
 
 
-class TagViewSet(ReadOnlyModelViewSet):
+class TagViewSet(SnapshotListMixin, ReadOnlyModelViewSet):
     """API-интерфейс для просмотра тегов."""
 
+    snapshot_name = TAGS_SNAPSHOT
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
 
 
-class IngredientViewSet(ReadOnlyModelViewSet):
+class IngredientViewSet(SnapshotListMixin, ReadOnlyModelViewSet):
     """API-интерфейс для просмотра ингредиентов."""
 
+    snapshot_name = INGREDIENTS_SNAPSHOT
     queryset = Ingredient.objects.all()
     serializer_class = IngredientSerializer
     filter_backends = (DjangoFilterBackend,)
@@ -162,7 +224,18 @@ class FoodgramUserViewSet(UserViewSet):
     queryset = UserModel.objects.all()
     serializer_class = UserSerializer
     pagination_class = FoodgramPageNumberPagination
+    filterset_class = UserFilter
     permission_classes = (permissions.IsAuthenticatedOrReadOnly,)
+    throttle_classes = (ActionTokenBucketThrottle,)
+    throttle_scopes = {
+        'create': 'user_create',
+        'set_password': 'user_write',
+        'subscribe': 'user_write',
+        'subscriptions': 'subscriptions',
+    }
+
+    def perform_destroy(self, instance):
+        start_purge(instance)
 
     def get_permissions(self):
         if self.action == 'me':
@@ -210,3 +283,12 @@ class FoodgramUserViewSet(UserViewSet):
             context={'request': request}
         ).data
         return paginator.get_paginated_response(serializer)
+
+
+class DatabasePoolView(APIView):
+    """Состояние пулов соединений с БД процесса, обработавшего запрос."""
+
+    permission_classes = (permissions.IsAdminUser,)
+
+    def get(self, request):
+        return Response({'pid': os.getpid(), 'pools': pool_stats()})
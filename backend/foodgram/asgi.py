@@ -1,7 +1,62 @@
+import asyncio
 import os
+from concurrent.futures import ThreadPoolExecutor
 
+from asgiref.sync import SyncToAsync, ThreadSensitiveContext
+from django.conf import settings
 from django.core.asgi import get_asgi_application
 
+from foodgram.startup import warm_up
+
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'foodgram.settings')
 
-application = get_asgi_application()
+
+class ThreadPerRequestApplication:
+    """
+    Выполняет синхронный код каждого HTTP-запроса в отдельном потоке.
+    Django 3.2 запускает синхронные представления через
+    sync_to_async(thread_sensitive=True), и без своего контекста
+    все запросы процесса выполняются в одном общем потоке: медленная
+    генерация PDF или декодирование изображения задерживают остальные.
+    Потоки берутся из общего пула ASGI_THREADS однопоточных
+    исполнителей: запрос занимает поток целиком и возвращает его
+    после ответа, лишние запросы ждут свободный поток. Потоки
+    и их соединения с БД переиспользуются между запросами.
+    """
+
+    def __init__(self, application):
+        self.application = application
+        self.executors = None
+
+    def create_executors(self):
+        self.executors = asyncio.Queue()
+        for number in range(settings.ASGI_THREADS):
+            self.executors.put_nowait(ThreadPoolExecutor(
+                max_workers=1,
+                thread_name_prefix=f'foodgram-asgi-{number}'
+            ))
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            return await self.application(scope, receive, send)
+        if self.executors is None:
+            self.create_executors()
+        executor = await self.executors.get()
+        try:
+            async with ThreadSensitiveContext() as context:
+                # asgiref выполняет синхронный код контекста
+                # в исполнителе из этого словаря, а если его там нет —
+                # создаёт новый поток на каждый запрос.
+                SyncToAsync.context_to_thread_executor[context] = executor
+                try:
+                    await self.application(scope, receive, send)
+                finally:
+                    # Иначе asgiref остановит поток при выходе
+                    # из контекста.
+                    SyncToAsync.context_to_thread_executor.pop(context, None)
+        finally:
+            self.executors.put_nowait(executor)
+
+
+application = ThreadPerRequestApplication(get_asgi_application())
+warm_up()
@@ -0,0 +1,29 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections
+
+_executor = None
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.BACKGROUND_WORKERS,
+            thread_name_prefix='foodgram-background'
+        )
+    return _executor
+
+
+def _run(func, args):
+    close_old_connections()
+    try:
+        func(*args)
+    finally:
+        close_old_connections()
+
+
+def submit(func, *args):
+    """Выполняет функцию в фоновом потоке со своим подключением к БД."""
+    return get_executor().submit(_run, func, args)
@@ -0,0 +1,45 @@
+import random
+import time
+from contextlib import suppress
+
+from django.core.cache.backends import filebased
+
+
+class FileBasedCache(filebased.FileBasedCache):
+    """
+    Файловый кэш с редкой очисткой каталога. Встроенный бэкенд
+    перечисляет весь каталог при каждой записи, а при переполнении
+    удаляет случайные записи, в том числе действующие. Здесь каталог
+    проверяется не чаще раза в CULL_INTERVAL секунд в каждом потоке.
+    При переполнении сначала проверяются на срок действия не больше
+    CULL_SAMPLE случайных записей: очистка не читает весь кэш внутри
+    запроса. Если места всё ещё нет, удаляются случайные записи,
+    как во встроенном бэкенде.
+    """
+
+    def __init__(self, dir, params):
+        super().__init__(dir, params)
+        options = params.get('OPTIONS', {})
+        self._cull_interval = options.get('CULL_INTERVAL', 60)
+        self._cull_sample = options.get('CULL_SAMPLE', 500)
+        self._culled = None
+
+    def _cull(self):
+        now = time.monotonic()
+        if (self._culled is not None
+                and now - self._culled < self._cull_interval):
+            return
+        self._culled = now
+        filelist = self._list_cache_files()
+        num_entries = len(filelist)
+        if num_entries < self._max_entries:
+            return
+        for fname in random.sample(
+            filelist, min(num_entries, self._cull_sample)
+        ):
+            with suppress(FileNotFoundError), open(fname, 'rb') as f:
+                if self._is_expired(f):
+                    num_entries -= 1
+        if num_entries < self._max_entries:
+            return
+        super()._cull()
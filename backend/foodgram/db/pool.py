@@ -0,0 +1,320 @@
+import os
+import threading
+import time
+from collections import deque
+
+import psycopg2
+from psycopg2 import extensions
+
+# Соединение, которое простаивало дольше, перед выдачей проверяется
+# запросом SELECT 1.
+HEALTH_CHECK_IDLE = 1
+
+# Соединения, унаследованные процессом после fork. Закрывать их нельзя:
+# при закрытии psycopg2 завершает сессию родительского процесса.
+_inherited = []
+
+
+class PoolTimeout(psycopg2.OperationalError):
+    """Свободное соединение не появилось за время ожидания."""
+
+
+class PooledConnection:
+    __slots__ = ('connection', 'created', 'returned', 'generation')
+
+    def __init__(self, connection, generation):
+        self.connection = connection
+        self.created = self.returned = time.monotonic()
+        self.generation = generation
+
+
+class ConnectionPool:
+    """
+    Потокобезопасный пул соединений psycopg2 одного процесса.
+    Соединение перед выдачей проверяется, сломанное соединение
+    заменяется новым. Если проверка не прошла (например, после
+    переключения на реплику), все соединения, открытые раньше,
+    считаются устаревшими и закрываются вместо повторной выдачи.
+    """
+
+    def __init__(self, connect, min_size=1, max_size=10, timeout=10,
+                 max_lifetime=None):
+        self.connect = connect
+        self.min_size = min_size
+        self.max_size = max_size
+        self.timeout = timeout
+        self.max_lifetime = max_lifetime
+        self.pid = os.getpid()
+        self.lock = threading.Condition()
+        self.idle = deque()
+        self.in_use = {}
+        self.opening = 0
+        self.waiting = 0
+        self.generation = 0
+        self.stats = {
+            'checkouts': 0,
+            'waits': 0,
+            'wait_ms': 0.0,
+            'max_wait_ms': 0.0,
+            'timeouts': 0,
+            'opened': 0,
+            'closed': 0,
+            'failed_checks': 0,
+        }
+
+    @property
+    def size(self):
+        return len(self.idle) + len(self.in_use) + self.opening
+
+    def getconn(self):
+        started = time.monotonic()
+        deadline = started + self.timeout
+        while True:
+            pooled = self.checkout(deadline)
+            if pooled is None:
+                pooled = self.open()
+            elif self.is_obsolete(pooled):
+                self.discard(pooled)
+                continue
+            elif not self.is_healthy(pooled):
+                self.discard(pooled, failed=True)
+                continue
+            break
+        waited = (time.monotonic() - started) * 1000
+        with self.lock:
+            self.in_use[id(pooled.connection)] = pooled
+            self.stats['checkouts'] += 1
+            self.stats['wait_ms'] += waited
+            self.stats['max_wait_ms'] = max(
+                self.stats['max_wait_ms'], waited
+            )
+        if self.min_size > self.size:
+            self.fill()
+        return pooled.connection
+
+    def checkout(self, deadline):
+        """
+        Свободное соединение из пула или None, если можно открыть
+        новое. Ждёт освобождения соединения, если пул заполнен.
+        """
+        with self.lock:
+            waited = False
+            while True:
+                if self.idle:
+                    return self.idle.pop()
+                if self.size < self.max_size:
+                    self.opening += 1
+                    return None
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self.stats['timeouts'] += 1
+                    raise PoolTimeout(
+                        f'Нет свободного соединения с БД за '
+                        f'{self.timeout} с (занято {len(self.in_use)} '
+                        f'из {self.max_size})'
+                    )
+                if not waited:
+                    waited = True
+                    self.stats['waits'] += 1
+                self.waiting += 1
+                try:
+                    self.lock.wait(remaining)
+                finally:
+                    self.waiting -= 1
+
+    def open(self):
+        """Открывает соединение на месте, занятом в checkout."""
+        try:
+            connection = self.connect()
+        except Exception:
+            with self.lock:
+                self.opening -= 1
+                self.lock.notify()
+            raise
+        with self.lock:
+            self.opening -= 1
+            self.stats['opened'] += 1
+            return PooledConnection(connection, self.generation)
+
+    def fill(self):
+        """Открывает соединения до min_size, не дожидаясь запросов."""
+        while True:
+            with self.lock:
+                if self.size >= self.min_size:
+                    return
+                self.opening += 1
+            try:
+                pooled = self.open()
+            except psycopg2.Error:
+                return
+            self.release(pooled)
+
+    def is_healthy(self, pooled):
+        if pooled.connection.closed:
+            return False
+        if time.monotonic() - pooled.returned < HEALTH_CHECK_IDLE:
+            return True
+        try:
+            with pooled.connection.cursor() as cursor:
+                cursor.execute('SELECT 1')
+            if not pooled.connection.autocommit:
+                pooled.connection.rollback()
+        except psycopg2.Error:
+            return False
+        return True
+
+    def is_obsolete(self, pooled):
+        return pooled.generation != self.generation or (
+            self.max_lifetime is not None
+            and time.monotonic() - pooled.created > self.max_lifetime
+        )
+
+    def putconn(self, connection):
+        with self.lock:
+            pooled = self.in_use.pop(id(connection), None)
+        if pooled is None:
+            if connection not in _inherited:
+                connection.close()
+            return
+        if connection.closed:
+            # Соединение разорвал сервер: остальные, скорее всего,
+            # тоже разорваны.
+            self.discard(pooled, failed=True)
+            return
+        if not self.reset(connection) or self.is_obsolete(pooled):
+            self.discard(pooled)
+            return
+        pooled.returned = time.monotonic()
+        self.release(pooled)
+
+    def release(self, pooled):
+        with self.lock:
+            self.idle.append(pooled)
+            self.lock.notify()
+
+    @staticmethod
+    def reset(connection):
+        """Откатывает незавершённую транзакцию; False — соединение сломано."""
+        if connection.closed:
+            return False
+        status = connection.get_transaction_status()
+        if status == extensions.TRANSACTION_STATUS_IDLE:
+            return True
+        if status in (extensions.TRANSACTION_STATUS_INTRANS,
+                      extensions.TRANSACTION_STATUS_INERROR):
+            try:
+                connection.rollback()
+            except psycopg2.Error:
+                return False
+            return True
+        return False
+
+    def discard(self, pooled, failed=False):
+        """
+        Закрывает соединение. После неудачной проверки устаревшими
+        становятся и все остальные открытые соединения.
+        """
+        with self.lock:
+            if failed:
+                self.stats['failed_checks'] += 1
+                if pooled.generation == self.generation:
+                    self.generation += 1
+            stale = [pooled]
+            if failed:
+                stale += self.idle
+                self.idle.clear()
+            self.stats['closed'] += len(stale)
+            self.lock.notify_all()
+        for item in stale:
+            try:
+                item.connection.close()
+            except psycopg2.Error:
+                pass
+
+    def close_all(self):
+        with self.lock:
+            idle = list(self.idle)
+            self.idle.clear()
+            self.generation += 1
+            self.stats['closed'] += len(idle)
+        for pooled in idle:
+            pooled.connection.close()
+
+    def abandon(self):
+        """Забывает соединения родительского процесса после fork."""
+        _inherited.extend(
+            pooled.connection
+            for pooled in (*self.idle, *self.in_use.values())
+        )
+        self.idle.clear()
+        self.in_use.clear()
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                'size': self.size,
+                'in_use': len(self.in_use),
+                'idle': len(self.idle),
+                'waiting': self.waiting,
+                'min_size': self.min_size,
+                'max_size': self.max_size,
+                **self.stats,
+                'wait_ms': round(self.stats['wait_ms'], 2),
+                'max_wait_ms': round(self.stats['max_wait_ms'], 2),
+            }
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def current_pool(key):
+    """
+    Пул текущего процесса или None. Пул, доставшийся от родителя
+    после fork (воркеры gunicorn), забывается вместе с соединениями.
+    """
+    pool = _pools.get(key)
+    if pool is not None and pool.pid != os.getpid():
+        pool.abandon()
+        del _pools[key]
+        return None
+    return pool
+
+
+def get_pool(key, connect, **options):
+    with _pools_lock:
+        pool = current_pool(key)
+        if pool is None:
+            pool = _pools[key] = ConnectionPool(connect, **options)
+        return pool
+
+
+def release(key, connection):
+    """Возвращает соединение в пул процесса, которым оно выдано."""
+    with _pools_lock:
+        pool = current_pool(key)
+    if pool is not None:
+        pool.putconn(connection)
+    elif connection not in _inherited:
+        connection.close()
+
+
+def close_pools(alias):
+    """Закрывает свободные соединения всех пулов псевдонима БД."""
+    with _pools_lock:
+        pools = [
+            pool for key, pool in _pools.items()
+            if key[0] == alias and pool.pid == os.getpid()
+        ]
+    for pool in pools:
+        pool.close_all()
+
+
+def pool_stats():
+    """Состояние пулов текущего процесса для мониторинга."""
+    with _pools_lock:
+        pools = [
+            (key, pool) for key, pool in _pools.items()
+            if pool.pid == os.getpid()
+        ]
+    return {key[0]: pool.snapshot() for key, pool in pools}
@@ -0,0 +1,51 @@
+from functools import partial
+
+from django.db.backends.postgresql import base
+
+from foodgram.db.pool import get_pool, release
+from foodgram.db.postgresql_pool.creation import DatabaseCreation
+
+POOL_DEFAULTS = {
+    'MIN_SIZE': 1,
+    'MAX_SIZE': 10,
+    'TIMEOUT': 10,
+    'MAX_LIFETIME': None,
+}
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """
+    Бэкенд PostgreSQL, который берёт соединения из пула процесса
+    и возвращает их туда вместо закрытия. Параметры пула задаются
+    словарём POOL в настройках базы данных (см. POOL_DEFAULTS).
+    """
+
+    creation_class = DatabaseCreation
+
+    def pool_key(self, conn_params):
+        return self.alias, repr(sorted(conn_params.items()))
+
+    def get_new_connection(self, conn_params):
+        options = {**POOL_DEFAULTS, **self.settings_dict.get('POOL', {})}
+        connection = get_pool(
+            self.pool_key(conn_params),
+            partial(super().get_new_connection, conn_params),
+            min_size=options['MIN_SIZE'],
+            max_size=options['MAX_SIZE'],
+            timeout=options['TIMEOUT'],
+            max_lifetime=options['MAX_LIFETIME'],
+        ).getconn()
+        # Соединение могло быть открыто другим потоком: уровень
+        # изоляции определяется так же, как для нового соединения.
+        self.isolation_level = self.settings_dict['OPTIONS'].get(
+            'isolation_level', connection.isolation_level
+        )
+        return connection
+
+    def _close(self):
+        if self.connection is not None:
+            with self.wrap_database_errors:
+                release(
+                    self.pool_key(self.get_connection_params()),
+                    self.connection
+                )
@@ -4,6 +4,7 @@ from pathlib import Path
 from dotenv import load_dotenv
 
 PAGE_SIZE = 10
+RECIPES_BATCH_LIMIT = 100
 
 load_dotenv()
 
@@ -42,6 +43,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'api.profiling.ProfilingMiddleware',
 ]
 
 ROOT_URLCONF = 'foodgram.urls'
@@ -66,12 +68,34 @@ WSGI_APPLICATION = 'foodgram.wsgi.application'
 
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.postgresql',
+        'ENGINE': 'foodgram.db.postgresql_pool',
         'NAME': os.getenv('POSTGRES_DB', 'django'),
         'USER': os.getenv('POSTGRES_USER', 'django'),
         'PASSWORD': os.getenv('POSTGRES_PASSWORD', ''),
         'HOST': os.getenv('DB_HOST', ''),
-        'PORT': os.getenv('DB_PORT', 5432)
+        'PORT': os.getenv('DB_PORT', 5432),
+        'POOL': {
+            'MIN_SIZE': int(os.getenv('DB_POOL_MIN_SIZE', 1)),
+            # Не меньше ASGI_THREADS + BACKGROUND_WORKERS.
+            'MAX_SIZE': int(os.getenv('DB_POOL_MAX_SIZE', 20)),
+            'TIMEOUT': float(os.getenv('DB_POOL_TIMEOUT', 10)),
+            'MAX_LIFETIME': int(os.getenv('DB_POOL_MAX_LIFETIME', 30 * 60)),
+        },
+    }
+}
+
+CACHES = {
+    'default': {
+        'BACKEND': 'foodgram.cache.FileBasedCache',
+        'LOCATION': os.getenv('CACHE_LOCATION', '/tmp/foodgram_cache'),
+        # Ключи на пользователя: корзины ограничения частоты запросов
+        # (по одной на область), флаги рецептов и фасеты.
+        'OPTIONS': {
+            'MAX_ENTRIES': int(os.getenv('CACHE_MAX_ENTRIES', 100000)),
+            'CULL_FREQUENCY': 10,
+            'CULL_INTERVAL': 60,
+            'CULL_SAMPLE': 500,
+        },
     }
 }
 
@@ -106,6 +130,9 @@ STATIC_ROOT = BASE_DIR / 'collected_static'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+IMAGE_MAX_SIZE = 5 * 1024 * 1024
+IMAGE_MAX_SIDE = 4096
+
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 AUTH_USER_MODEL = 'users.FoodgramUser'
@@ -122,6 +149,42 @@ REST_FRAMEWORK = {
     'DEFAULT_FILTER_BACKENDS': ['django_filters.rest_framework.DjangoFilterBackend']
 }
 
+# Файлы блокировок корзин, общие для воркеров хоста.
+THROTTLE_LOCKS_DIR = os.getenv(
+    'THROTTLE_LOCKS_DIR', '/tmp/foodgram_throttle_locks'
+)
+THROTTLE_BUCKETS = {
+    'recipe_write': {'burst': 60, 'rate': '300/hour'},
+    'shopping_cart_download': {'burst': 5, 'rate': '30/hour'},
+    'user_create': {'burst': 30, 'rate': '100/hour'},
+    'user_write': {'burst': 20, 'rate': '120/hour'},
+    'subscriptions': {'burst': 30, 'rate': '600/hour'},
+}
+
+RECIPE_FLAGS_TTL = 60 * 60
+FACETS_TTL = int(os.getenv('FACETS_TTL', 60))
+
+TRENDING_HALF_LIFE = int(os.getenv('TRENDING_HALF_LIFE', 3 * 24 * 60 * 60))
+# События старше десяти периодов полураспада дают меньше 0,1% веса.
+TRENDING_WINDOW = 10 * TRENDING_HALF_LIFE
+
+# Одновременных запросов и потоков на процесс в режиме ASGI.
+ASGI_THREADS = int(os.getenv('ASGI_THREADS', 16))
+
+BACKGROUND_WORKERS = int(os.getenv('BACKGROUND_WORKERS', 2))
+SHOPPING_LIST_TTL = int(os.getenv('SHOPPING_LIST_TTL', 60 * 60))
+# Задача в очереди или в работе дольше считается потерянной.
+SHOPPING_LIST_JOB_TIMEOUT = int(os.getenv('SHOPPING_LIST_JOB_TIMEOUT', 120))
+# Удаление аккаунта без движения дольше считается брошенным.
+ACCOUNT_PURGE_TIMEOUT = int(os.getenv('ACCOUNT_PURGE_TIMEOUT', 10 * 60))
+
+PROFILING_DIR = Path(os.getenv('PROFILING_DIR', BASE_DIR / 'profiles'))
+PROFILING_SAMPLE_RATE = float(os.getenv('PROFILING_SAMPLE_RATE', 0))
+PROFILING_PROFILER = os.getenv('PROFILING_PROFILER', 'cprofile')
+# Старые и лишние профили удаляются при сохранении нового.
+PROFILING_MAX_PROFILES = int(os.getenv('PROFILING_MAX_PROFILES', 500))
+PROFILING_MAX_AGE = int(os.getenv('PROFILING_MAX_AGE', 7 * 24 * 60 * 60))
+
 DJOSER = {
     'LOGIN_FIELD': 'email',
     'HIDE_USERS': False,
@@ -0,0 +1,12 @@
+from django.urls import get_resolver
+
+
+def warm_up():
+    """
+    Загружает URLconf, а с ним представления, сериализаторы и djoser,
+    при создании приложения, а не при первом запросе. Под gunicorn
+    с preload_app это происходит один раз в мастере, и воркеры делят
+    загруженные модули. К базе данных функция не обращается,
+    ReportLab и Pillow загружаются при первом использовании.
+    """
+    get_resolver().url_patterns
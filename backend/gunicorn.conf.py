@@ -0,0 +1,37 @@
+import gc
+import os
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:8000')
+workers = int(os.getenv('GUNICORN_WORKERS', 1))
+# Приложение загружается в мастере до fork, воркеры делят его память.
+preload_app = os.getenv('GUNICORN_PRELOAD', 'True') == 'True'
+
+# SERVER_MODE=asgi запускает приложение под uvicorn-воркерами:
+# запросы обрабатываются в потоках, см. foodgram.asgi.
+if os.getenv('SERVER_MODE', 'wsgi') == 'asgi':
+    wsgi_app = 'foodgram.asgi:application'
+    worker_class = 'uvicorn.workers.UvicornWorker'
+else:
+    wsgi_app = 'foodgram.wsgi'
+
+
+def when_ready(server):
+    """
+    Объекты, загруженные мастером, исключаются из сборки мусора:
+    обход GC в воркерах иначе записывает в их страницы памяти
+    и разрушает общее копирование при записи.
+    """
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    """
+    Воркер не должен пользоваться соединениями с БД, открытыми
+    мастером до fork. Пул соединений при закрытии в воркере
+    их только забывает, и сессии мастера остаются целыми.
+    """
+    from django.conf import settings
+    if settings.configured:
+        from django.db import connections
+        for connection in connections.all():
+            connection.close()
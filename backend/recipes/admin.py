@@ -11,6 +11,10 @@ class IngridientsInLine(admin.StackedInline):
     """Отображение связанных ингредиентов в админке рецепта."""
     model = RecipeIngredient
     extra = 0
+    autocomplete_fields = ('ingredient',)
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('ingredient')
 
 
 @admin.register(Recipe)
@@ -22,13 +26,20 @@ class RecipeAdmin(admin.ModelAdmin):
         'author',
         'get_favorites_count'
     )
+    list_select_related = ('author',)
     list_filter = (
         'tags',
     )
     search_fields = (
-        'name',
-        'author',
+        '^name',
+        '^author__username',
     )
+    autocomplete_fields = ('author',)
+    show_full_result_count = False
+
+    @admin.display(description='В избранном', ordering='favorites_count')
+    def get_favorites_count(self, recipe):
+        return recipe.favorites_count
 
 
 @admin.register(Ingredient)
@@ -41,7 +52,8 @@ class IngredientAdmin(admin.ModelAdmin):
     list_editable = (
         'measurement_unit',
     )
-    search_fields = ('name',)
+    search_fields = ('^name',)
+    show_full_result_count = False
 
 
 @admin.register(Tag)
@@ -65,9 +77,13 @@ class ShoppingCartAdmin(admin.ModelAdmin):
 
     list_display = (
         'user',
-        'recipe'
+        'recipe',
+        'created'
     )
-    search_fields = ('user',)
+    list_select_related = ('user', 'recipe')
+    search_fields = ('^user__username',)
+    autocomplete_fields = ('user', 'recipe')
+    show_full_result_count = False
 
 
 @admin.register(Favorites)
@@ -76,6 +92,10 @@ class FavoritesAdmin(admin.ModelAdmin):
 
     list_display = (
         'user',
-        'recipe'
+        'recipe',
+        'created'
     )
-    search_fields = ('user',)
+    list_select_related = ('user', 'recipe')
+    search_fields = ('^user__username',)
+    autocomplete_fields = ('user', 'recipe')
+    show_full_result_count = False
@@ -0,0 +1,91 @@
+import os
+import shutil
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from recipes.media_gc import BATCH_SIZE, orphaned_files
+
+GRACE_HOURS = 24
+
+
+class Command(BaseCommand):
+    help = (
+        'Удаляет из MEDIA_ROOT файлы, на которые не ссылается ни одна '
+        'модель: старые изображения рецептов, PDF списков покупок. '
+        'Файлы моложе периода ожидания не трогает.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--grace-hours', type=float, default=GRACE_HOURS,
+            help='Не трогать файлы, изменённые за это число часов.'
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Только показать файлы, которые будут удалены.'
+        )
+        parser.add_argument(
+            '--quarantine', metavar='DIR',
+            help='Переносить файлы в каталог вместо удаления.'
+        )
+        parser.add_argument(
+            '--rate', type=float, default=0,
+            help='Не больше стольких файлов в секунду (0 — без ограничения).'
+        )
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        grace = options['grace_hours'] * 60 * 60
+        quarantine = options['quarantine']
+        if quarantine is not None:
+            quarantine = os.path.abspath(quarantine)
+            if quarantine.startswith(
+                os.path.abspath(settings.MEDIA_ROOT) + os.sep
+            ):
+                raise CommandError('Карантин не может быть внутри MEDIA_ROOT.')
+        interval = 1 / options['rate'] if options['rate'] > 0 else 0
+        count = total_size = 0
+        started = time.monotonic()
+        for path, size in orphaned_files(grace, options['batch_size']):
+            if options['dry_run']:
+                self.stdout.write(path)
+            elif not self.collect(path, grace, quarantine):
+                continue
+            count += 1
+            total_size += size
+            if interval:
+                delay = started + count * interval - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+        action = (
+            'Будет обработано' if options['dry_run']
+            else 'Перенесено в карантин' if quarantine else 'Удалено'
+        )
+        self.stdout.write(
+            f'{action} файлов: {count}, '
+            f'{total_size / 1024 / 1024:.1f} МБ'
+        )
+
+    @staticmethod
+    def collect(path, grace, quarantine):
+        """
+        Удаляет файл или переносит его в карантин. Дата изменения
+        проверяется ещё раз: файл могли переиспользовать после
+        проверки ссылок.
+        """
+        try:
+            if os.stat(path).st_mtime > time.time() - grace:
+                return False
+            if quarantine is None:
+                os.remove(path)
+                return True
+            target = os.path.join(
+                quarantine, os.path.relpath(path, settings.MEDIA_ROOT)
+            )
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            shutil.move(path, target)
+        except FileNotFoundError:
+            return False
+        return True
@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+
+from api.shopping_list import expire_jobs
+
+
+class Command(BaseCommand):
+    help = 'Удаляет устаревшие PDF со списками покупок.'
+
+    def handle(self, *args, **options):
+        self.stdout.write(f'Удалено списков покупок: {expire_jobs()}')
@@ -0,0 +1,87 @@
+import base64
+import json
+import sys
+
+from django.core.management.base import BaseCommand
+from django.db.models import Prefetch
+
+from recipes.models import Recipe, RecipeIngredient
+
+CHUNK_SIZE = 500
+
+
+def recipe_line(recipe, inline_images):
+    image = {'name': recipe.image.name}
+    if inline_images and recipe.image:
+        with recipe.image.open('rb') as image_file:
+            image['content'] = base64.b64encode(image_file.read()).decode()
+    return {
+        'name': recipe.name,
+        'text': recipe.text,
+        'cooking_time': recipe.cooking_time,
+        'pub_date': recipe.pub_date.isoformat(),
+        'author': {
+            'email': recipe.author.email,
+            'username': recipe.author.username,
+        },
+        'tags': [tag.slug for tag in recipe.tags.all()],
+        'ingredients': [
+            {
+                'name': item.ingredient.name,
+                'measurement_unit': item.ingredient.measurement_unit,
+                'amount': item.amount,
+            }
+            for item in recipe.recipe_ingredient.all()
+        ],
+        'image': image,
+    }
+
+
+class Command(BaseCommand):
+    help = 'Выгружает рецепты в формате JSON Lines.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--output', help='Файл для выгрузки (по умолчанию stdout).'
+        )
+        parser.add_argument(
+            '--inline-images', action='store_true',
+            help='Встраивать изображения в base64 вместо ссылок на файлы.'
+        )
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        output = sys.stdout
+        if options['output']:
+            output = open(options['output'], 'w', encoding='utf-8')
+        queryset = Recipe.objects.order_by('pk').select_related(
+            'author'
+        ).prefetch_related(
+            'tags',
+            Prefetch(
+                'recipe_ingredient',
+                queryset=RecipeIngredient.objects.select_related(
+                    'ingredient'
+                ).order_by('pk')
+            )
+        )
+        exported = 0
+        last_pk = 0
+        try:
+            while True:
+                chunk = list(
+                    queryset.filter(pk__gt=last_pk)[:options['chunk_size']]
+                )
+                if not chunk:
+                    break
+                for recipe in chunk:
+                    output.write(json.dumps(
+                        recipe_line(recipe, options['inline_images']),
+                        ensure_ascii=False
+                    ) + '\n')
+                exported += len(chunk)
+                last_pk = chunk[-1].pk
+        finally:
+            if output is not sys.stdout:
+                output.close()
+        self.stderr.write(f'Выгружено рецептов: {exported}')
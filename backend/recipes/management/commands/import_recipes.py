@@ -0,0 +1,192 @@
+import base64
+import json
+import os
+from collections import Counter
+from itertools import islice
+
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils.dateparse import parse_datetime
+
+from api.snapshots import INGREDIENTS_SNAPSHOT, bump_version
+from recipes.models import (Ingredient, Recipe, RecipeImport,
+                            RecipeIngredient, Tag)
+
+UserModel = get_user_model()
+
+BATCH_SIZE = 200
+
+
+def resolve_ingredients(lines):
+    """
+    Находит ингредиенты пачки по паре название + единица измерения,
+    недостающие создаёт.
+    """
+    keys = {
+        (item['name'], item['measurement_unit'])
+        for line in lines for item in line['ingredients']
+    }
+    names = {name for name, _ in keys}
+
+    def load():
+        return {
+            (ingredient.name, ingredient.measurement_unit): ingredient
+            for ingredient in Ingredient.objects.filter(name__in=names)
+        }
+
+    ingredients = load()
+    missing = keys - ingredients.keys()
+    if missing:
+        Ingredient.objects.bulk_create(
+            [Ingredient(name=name, measurement_unit=unit)
+             for name, unit in missing],
+            ignore_conflicts=True
+        )
+        bump_version(INGREDIENTS_SNAPSHOT)
+        ingredients = load()
+    return ingredients
+
+
+def save_image(image):
+    if 'content' not in image:
+        return image['name']
+    storage = Recipe._meta.get_field('image').storage
+    return storage.save(
+        image['name'], ContentFile(base64.b64decode(image['content']))
+    )
+
+
+def insert_recipes(recipes):
+    """
+    Вставляет рецепты пачкой, сохраняя исходные даты публикации.
+    Если база не возвращает первичные ключи из bulk_create,
+    рецепты сохраняются по одному в режиме raw.
+    """
+    if not connection.features.can_return_rows_from_bulk_insert:
+        for recipe in recipes:
+            recipe.save_base(raw=True)
+        return
+    pub_dates = [recipe.pub_date for recipe in recipes]
+    Recipe.objects.bulk_create(recipes)
+    for recipe, pub_date in zip(recipes, pub_dates):
+        recipe.pub_date = pub_date
+    Recipe.objects.bulk_update(recipes, ['pub_date'])
+
+
+class Command(BaseCommand):
+    help = (
+        'Загружает рецепты из JSON Lines, выгруженного export_recipes. '
+        'После сбоя продолжает с последней сохранённой пачки.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Файл JSON Lines с рецептами.')
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+        parser.add_argument(
+            '--checkpoint',
+            help='Ключ контрольной точки в базе данных '
+                 '(по умолчанию абсолютный путь к файлу).'
+        )
+        parser.add_argument(
+            '--restart', action='store_true',
+            help='Игнорировать контрольную точку и начать сначала.'
+        )
+
+    def handle(self, *args, **options):
+        path = options['path']
+        checkpoint = options['checkpoint'] or os.path.abspath(path)
+        if options['restart']:
+            RecipeImport.objects.filter(source=checkpoint).delete()
+        done = RecipeImport.objects.filter(source=checkpoint).values_list(
+            'lines', flat=True
+        ).first() or 0
+        if done:
+            self.stdout.write(f'Продолжение со строки {done + 1}')
+        self.tags = dict(Tag.objects.values_list('slug', 'pk'))
+        imported = skipped = 0
+        with open(path, encoding='utf-8') as source:
+            lines = islice(source, done, None)
+            while True:
+                batch = [
+                    json.loads(line)
+                    for line in islice(lines, options['batch_size'])
+                ]
+                if not batch:
+                    break
+                done += len(batch)
+                created = self.import_batch(batch, checkpoint, done)
+                imported += created
+                skipped += len(batch) - created
+        RecipeImport.objects.filter(source=checkpoint).delete()
+        self.stdout.write(
+            f'Загружено рецептов: {imported}, пропущено: {skipped}'
+        )
+
+    @transaction.atomic
+    def import_batch(self, batch, checkpoint, done):
+        """
+        Загружает пачку и в той же транзакции сохраняет контрольную
+        точку: после сбоя пачка загружается заново или не загружается
+        вовсе.
+        """
+        authors = {
+            user.email: user
+            for user in UserModel.objects.filter(
+                email__in={line['author']['email'] for line in batch}
+            )
+        }
+        ingredients = resolve_ingredients(batch)
+        recipes = []
+        lines = []
+        for line in batch:
+            author = authors.get(line['author']['email'])
+            if author is None:
+                self.stderr.write(
+                    f'Автор {line["author"]["email"]} не найден, '
+                    f'рецепт "{line["name"]}" пропущен'
+                )
+                continue
+            recipes.append(Recipe(
+                author=author,
+                name=line['name'],
+                text=line['text'],
+                cooking_time=line['cooking_time'],
+                pub_date=parse_datetime(line['pub_date']),
+                image=save_image(line['image']),
+            ))
+            lines.append(line)
+        insert_recipes(recipes)
+        recipe_tags = []
+        recipe_ingredients = []
+        for recipe, line in zip(recipes, lines):
+            for slug in line['tags']:
+                if slug not in self.tags:
+                    raise CommandError(f'Тэг "{slug}" не найден')
+                recipe_tags.append(Recipe.tags.through(
+                    recipe_id=recipe.pk, tag_id=self.tags[slug]
+                ))
+            recipe_ingredients.extend(
+                RecipeIngredient(
+                    recipe=recipe,
+                    ingredient=ingredients[
+                        (item['name'], item['measurement_unit'])
+                    ],
+                    amount=item['amount'],
+                )
+                for item in line['ingredients']
+            )
+        Recipe.tags.through.objects.bulk_create(recipe_tags)
+        RecipeIngredient.objects.bulk_create(recipe_ingredients)
+        for author_id, count in Counter(
+            recipe.author_id for recipe in recipes
+        ).items():
+            UserModel.objects.filter(pk=author_id).update(
+                recipes_count=F('recipes_count') + count
+            )
+        RecipeImport.objects.update_or_create(
+            source=checkpoint, defaults={'lines': done}
+        )
+        return len(recipes)
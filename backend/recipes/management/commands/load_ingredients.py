@@ -2,6 +2,7 @@ import json
 
 from django.core.management.base import BaseCommand
 
+from api.snapshots import INGREDIENTS_SNAPSHOT, bump_version
 from recipes.models import Ingredient
 
 
@@ -19,3 +20,4 @@ class Command(BaseCommand):
                 )
             )
         Ingredient.objects.bulk_create(ingredients, ignore_conflicts=True)
+        bump_version(INGREDIENTS_SNAPSHOT)
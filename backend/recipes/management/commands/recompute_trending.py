@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from recipes.trending import update_trending_scores
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает популярность рецептов за последнее время '
+        '(сортировка ordering=trending). Запускается периодически, '
+        'например раз в 10 минут по cron.'
+    )
+
+    def handle(self, *args, **options):
+        self.stdout.write(f'Обновлено рецептов: {update_trending_scores()}')
@@ -0,0 +1,61 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from api.readers import rebuild_documents
+from recipes.models import Recipe
+from recipes.storage import is_hashed_name
+
+BATCH_SIZE = 200
+
+
+class Command(BaseCommand):
+    help = (
+        'Переносит изображения рецептов в хранилище с именами '
+        'по хэшу содержимого и удаляет старые файлы. '
+        'Повторный запуск пропускает уже перенесённые изображения.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        storage = Recipe._meta.get_field('image').storage
+        moved = missing = 0
+        last_pk = 0
+        while True:
+            batch = list(Recipe.objects.filter(
+                pk__gt=last_pk
+            ).exclude(image='').order_by('pk').values_list(
+                'pk', 'image'
+            )[:options['batch_size']])
+            if not batch:
+                break
+            last_pk = batch[-1][0]
+            renamed = {}
+            for pk, name in batch:
+                if is_hashed_name(name):
+                    continue
+                if not storage.exists(name):
+                    self.stderr.write(f'Рецепт {pk}: файл {name} не найден')
+                    missing += 1
+                    continue
+                with storage.open(name) as source:
+                    renamed[pk] = (name, storage.save(name, source))
+            if not renamed:
+                continue
+            with transaction.atomic():
+                Recipe.objects.bulk_update(
+                    [Recipe(pk=pk, image=new)
+                     for pk, (_, new) in renamed.items()],
+                    ['image']
+                )
+                rebuild_documents(list(renamed))
+            old_names = {old for old, _ in renamed.values()}
+            for name in old_names - set(Recipe.objects.filter(
+                image__in=old_names
+            ).values_list('image', flat=True)):
+                storage.delete(name)
+            moved += len(renamed)
+        self.stdout.write(
+            f'Перенесено изображений: {moved}, не найдено: {missing}'
+        )
@@ -0,0 +1,95 @@
+import os
+import posixpath
+import time
+
+from django.apps import apps
+from django.core.files.storage import FileSystemStorage
+from django.db import models
+
+BATCH_SIZE = 500
+
+
+def file_fields():
+    """
+    Поля-файлы всех моделей, которые хранятся на диске
+    в каталоге с постоянным именем.
+    """
+    for model in apps.get_models():
+        for field in model._meta.get_fields():
+            if (isinstance(field, models.FileField)
+                    and isinstance(field.storage, FileSystemStorage)
+                    and not callable(field.upload_to)):
+                yield model, field
+
+
+def walk(path):
+    """Обходит дерево каталогов, не загружая его в память целиком."""
+    try:
+        entries = os.scandir(path)
+    except FileNotFoundError:
+        return
+    with entries:
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                yield from walk(entry.path)
+            elif entry.is_file(follow_symlinks=False):
+                yield entry
+
+
+def referenced(fields, names):
+    """Какие из имён файлов записаны хотя бы в одном из полей."""
+    found = set()
+    for model, field in fields:
+        found.update(model._default_manager.filter(
+            **{f'{field.name}__in': names}
+        ).values_list(field.name, flat=True))
+    return found
+
+
+def orphaned_files(grace, batch_size=BATCH_SIZE):
+    """
+    Файлы в каталогах загрузки, на которые не ссылается ни одна
+    модель и которые не менялись дольше grace секунд: пары
+    (путь, размер). Ссылки проверяются пачками по batch_size имён.
+    Период ожидания защищает файлы, которые уже сохранены,
+    но ещё не записаны в базу.
+    """
+    fields = list(file_fields())
+    roots = {}
+    for model, field in fields:
+        location = field.storage.location
+        root = posixpath.normpath(field.upload_to.split('%')[0] or '.')
+        roots.setdefault(location, set()).add(root)
+    deadline = time.time() - grace
+    for location, directories in roots.items():
+        same_location = [
+            (model, field) for model, field in fields
+            if field.storage.location == location
+        ]
+        for directory in sorted(directories):
+            # Вложенный каталог уже обойдён вместе с родительским.
+            if any(parent != directory and (
+                parent == '.' or directory.startswith(parent + '/')
+            ) for parent in directories):
+                continue
+            batch = {}
+            for entry in walk(os.path.join(location, directory)):
+                stat = entry.stat(follow_symlinks=False)
+                if stat.st_mtime > deadline:
+                    continue
+                name = os.path.relpath(entry.path, location).replace(
+                    os.sep, '/'
+                )
+                batch[name] = (entry.path, stat.st_size)
+                if len(batch) >= batch_size:
+                    yield from unreferenced(same_location, batch)
+                    batch = {}
+            if batch:
+                yield from unreferenced(same_location, batch)
+
+
+def unreferenced(fields, batch):
+    found = referenced(fields, list(batch))
+    for name, file in batch.items():
+        if name not in found:
+            yield file
@@ -0,0 +1,25 @@
+# Generated by Django 3.2.3 on 2026-10-19 09:19
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0005_shoppinglistjob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecipeDocument',
+            fields=[
+                ('recipe', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='document', serialize=False, to='recipes.recipe')),
+                ('data', models.JSONField(verbose_name='Документ')),
+            ],
+            options={
+                'verbose_name': 'документ рецепта',
+                'verbose_name_plural': 'Документы рецептов',
+            },
+        ),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 3.2.3 on 2026-10-19 09:29
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+import django.utils.timezone
+
+
+def fill_created(apps, schema_editor):
+    # Настоящее время добавления старых записей неизвестно:
+    # берём дату публикации рецепта, чтобы они не считались свежими.
+    Recipe = apps.get_model('recipes', 'Recipe')
+    for model_name in ('Favorites', 'ShoppingCart'):
+        apps.get_model('recipes', model_name).objects.update(
+            created=Subquery(
+                Recipe.objects.filter(
+                    pk=OuterRef('recipe_id')
+                ).values('pub_date')[:1]
+            )
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0006_recipedocument'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='favorites',
+            name='created',
+            field=models.DateTimeField(auto_now_add=True, db_index=True, default=django.utils.timezone.now, verbose_name='Дата добавления'),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='trending_score',
+            field=models.FloatField(default=0, editable=False, verbose_name='Популярность за последнее время'),
+        ),
+        migrations.AddField(
+            model_name='shoppingcart',
+            name='created',
+            field=models.DateTimeField(auto_now_add=True, db_index=True, default=django.utils.timezone.now, verbose_name='Дата добавления'),
+            preserve_default=False,
+        ),
+        migrations.RunPython(fill_created, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['-trending_score', '-id'], name='recipe_trending_idx'),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 3.2.3 on 2026-10-19 10:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0008_recipe_image_storage'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecipeImport',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source', models.CharField(max_length=1024, unique=True, verbose_name='Источник')),
+                ('lines', models.PositiveIntegerField(default=0, verbose_name='Загружено строк')),
+                ('updated', models.DateTimeField(auto_now=True, verbose_name='Дата обновления')),
+            ],
+            options={
+                'verbose_name': 'загрузка рецептов',
+                'verbose_name_plural': 'Загрузки рецептов',
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 3.2.3 on 2026-10-19 10:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0009_recipeimport'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='document_version',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Версия документа'),
+        ),
+        migrations.AddField(
+            model_name='recipedocument',
+            name='version',
+            field=models.PositiveIntegerField(default=0, verbose_name='Версия'),
+        ),
+    ]
@@ -1,9 +1,10 @@
 from colorfield.fields import ColorField
 from django.db import models
-from django.db.models import Exists, OuterRef
 from django.core.validators import MinValueValidator
 from django.contrib.auth import get_user_model
 
+from recipes.storage import ContentAddressedStorage
+
 
 UserModel = get_user_model()
 
@@ -61,6 +62,11 @@ class BaseListModel(models.Model):
     recipe = models.ForeignKey(
         'Recipe', on_delete=models.CASCADE, related_name='%(class)srecipes'
     )
+    created = models.DateTimeField(
+        'Дата добавления',
+        auto_now_add=True,
+        db_index=True
+    )
 
     class Meta:
         abstract = True
@@ -94,22 +100,13 @@ class ShoppingCart(BaseListModel):
         verbose_name_plural = 'Список покупок'
 
 
-class RecipeQuerySet(models.QuerySet):
-    def recipe_annotate(self, user):
-        return self.annotate(
-            is_favorited=Exists(
-                Favorites.objects.filter(
-                    recipe=OuterRef('pk'),
-                    user=user
-                )
-            ),
-            is_in_shopping_cart=Exists(
-                ShoppingCart.objects.filter(
-                    recipe=OuterRef('pk'),
-                    user=user
-                )
-            ),
-        )
+RECIPE_ORDERINGS = {
+    'newest': ('-pub_date', '-id'),
+    'name': ('name', 'id'),
+    'cooking_time': ('cooking_time', 'id'),
+    'popularity': ('-favorites_count', '-id'),
+    'trending': ('-trending_score', '-id'),
+}
 
 
 class Recipe(models.Model):
@@ -144,26 +141,78 @@ class Recipe(models.Model):
     image = models.ImageField(
         'Фото рецепта',
         upload_to='recipes/images/',
+        storage=ContentAddressedStorage(),
     )
     pub_date = models.DateTimeField(
         'Дата публикации',
-        auto_now_add=True,
-        db_index=True
+        auto_now_add=True
+    )
+    favorites_count = models.PositiveIntegerField(
+        'Добавлений в избранное',
+        default=0,
+        editable=False
+    )
+    trending_score = models.FloatField(
+        'Популярность за последнее время',
+        default=0,
+        editable=False
+    )
+    document_version = models.PositiveIntegerField(
+        'Версия документа',
+        default=0,
+        editable=False
     )
-    objects = RecipeQuerySet.as_manager()
 
     class Meta:
         verbose_name = 'рецепт'
         verbose_name_plural = 'Рецепты'
         default_related_name = 'recipes'
-        ordering = ('-pub_date',)
+        ordering = ('-pub_date', '-id')
+        indexes = [
+            models.Index(
+                fields=('-pub_date', '-id'),
+                name='recipe_newest_idx'
+            ),
+            models.Index(fields=('name', 'id'), name='recipe_name_idx'),
+            models.Index(
+                fields=('cooking_time', 'id'),
+                name='recipe_cooking_time_idx'
+            ),
+            models.Index(
+                fields=('-favorites_count', '-id'),
+                name='recipe_popularity_idx'
+            ),
+            models.Index(
+                fields=('-trending_score', '-id'),
+                name='recipe_trending_idx'
+            ),
+        ]
+
+    def save(self, *args, **kwargs):
+        """
+        Версия документа меняется только запросами UPDATE с F()
+        и при сохранении рецепта не записывается: иначе прочитанное
+        при загрузке значение откатило бы версию назад, и документ,
+        собранный до изменения, снова считался бы действительным.
+        """
+        if not self._state.adding and not kwargs.get('force_insert'):
+            update_fields = kwargs.get('update_fields')
+            if update_fields is None:
+                deferred = self.get_deferred_fields()
+                update_fields = [
+                    field.name for field in self._meta.concrete_fields
+                    if not field.primary_key
+                    and field.attname not in deferred
+                ]
+            kwargs['update_fields'] = [
+                name for name in update_fields
+                if name != 'document_version'
+            ]
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return self.name
 
-    def get_favorites_count(recipe):
-        return Favorites.objects.filter(recipe=recipe).count()
-
 
 class RecipeIngredient(models.Model):
     """Модель связи между рецептами и ингредиентами."""
@@ -185,3 +234,82 @@ class RecipeIngredient(models.Model):
 
     def __str__(self):
         return f'{self.recipe.name}: {self.ingredient.name}'
+
+
+class ShoppingListJob(models.Model):
+    """Модель задачи на формирование PDF со списком покупок."""
+
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUSES = (
+        (PENDING, 'В очереди'),
+        (RUNNING, 'Выполняется'),
+        (DONE, 'Готово'),
+        (FAILED, 'Ошибка'),
+    )
+
+    key = models.CharField('Ключ содержимого', max_length=64, unique=True)
+    status = models.CharField(
+        'Статус',
+        max_length=16,
+        choices=STATUSES,
+        default=PENDING
+    )
+    ingredients = models.JSONField('Ингредиенты')
+    file = models.FileField(
+        'Файл',
+        upload_to='shopping_lists/',
+        blank=True
+    )
+    updated = models.DateTimeField('Дата обновления', auto_now=True)
+
+    class Meta:
+        verbose_name = 'задача списка покупок'
+        verbose_name_plural = 'Задачи списков покупок'
+
+    def __str__(self):
+        return f'{self.key} ({self.get_status_display()})'
+
+
+class RecipeDocument(models.Model):
+    """
+    Денормализованный JSON рецепта для чтения без данных,
+    зависящих от текущего пользователя. Документ действителен,
+    пока его версия совпадает с Recipe.document_version.
+    """
+
+    recipe = models.OneToOneField(
+        Recipe,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='document'
+    )
+    version = models.PositiveIntegerField('Версия', default=0)
+    data = models.JSONField('Документ')
+
+    class Meta:
+        verbose_name = 'документ рецепта'
+        verbose_name_plural = 'Документы рецептов'
+
+    def __str__(self):
+        return str(self.recipe_id)
+
+
+class RecipeImport(models.Model):
+    """
+    Модель контрольной точки загрузки рецептов: сколько строк
+    файла загружено. Обновляется в транзакции вместе с пачкой.
+    """
+
+    source = models.CharField('Источник', max_length=1024, unique=True)
+    lines = models.PositiveIntegerField('Загружено строк', default=0)
+    updated = models.DateTimeField('Дата обновления', auto_now=True)
+
+    class Meta:
+        verbose_name = 'загрузка рецептов'
+        verbose_name_plural = 'Загрузки рецептов'
+
+    def __str__(self):
+        return f'{self.source}: {self.lines}'
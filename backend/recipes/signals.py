@@ -0,0 +1,97 @@
+from django.contrib.auth import get_user_model
+from django.db.models import F
+from django.db.models.signals import (m2m_changed, post_delete, post_save,
+                                      pre_delete)
+from django.dispatch import receiver
+
+from recipes.models import (Favorites, Ingredient, Recipe, RecipeIngredient,
+                            Tag)
+
+UserModel = get_user_model()
+
+AUTHOR_FIELDS = {'email', 'username', 'first_name', 'last_name'}
+
+
+@receiver(post_save, sender=Recipe)
+def increment_recipes_count(sender, instance, created, raw=False, **kwargs):
+    if not created or raw:
+        return
+    UserModel.objects.filter(pk=instance.author_id).update(
+        recipes_count=F('recipes_count') + 1
+    )
+
+
+@receiver(post_delete, sender=Recipe)
+def decrement_recipes_count(sender, instance, **kwargs):
+    UserModel.objects.filter(
+        pk=instance.author_id, recipes_count__gt=0
+    ).update(recipes_count=F('recipes_count') - 1)
+
+
+@receiver(post_save, sender=Favorites)
+def increment_favorites_count(sender, instance, created, raw=False,
+                              **kwargs):
+    if not created or raw:
+        return
+    Recipe.objects.filter(pk=instance.recipe_id).update(
+        favorites_count=F('favorites_count') + 1
+    )
+
+
+@receiver(post_delete, sender=Favorites)
+def decrement_favorites_count(sender, instance, **kwargs):
+    Recipe.objects.filter(
+        pk=instance.recipe_id, favorites_count__gt=0
+    ).update(favorites_count=F('favorites_count') - 1)
+
+
+def invalidate_documents(recipes):
+    """
+    Переводит рецепты на новую версию документа. Версия меняется
+    в транзакции изменения: документ, собранный из данных до неё,
+    сохраняется со старой версией и не читается.
+    """
+    recipes.update(document_version=F('document_version') + 1)
+
+
+@receiver(post_save, sender=Recipe)
+def invalidate_recipe_document(sender, instance, **kwargs):
+    invalidate_documents(Recipe.objects.filter(pk=instance.pk))
+
+
+@receiver((post_save, post_delete), sender=RecipeIngredient)
+def invalidate_recipe_document_on_ingredients(sender, instance, **kwargs):
+    invalidate_documents(Recipe.objects.filter(pk=instance.recipe_id))
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def invalidate_recipe_document_on_tags(sender, instance, action, reverse,
+                                       pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'pre_clear'):
+        return
+    if not reverse:
+        invalidate_documents(Recipe.objects.filter(pk=instance.pk))
+    elif pk_set is not None:
+        invalidate_documents(Recipe.objects.filter(pk__in=pk_set))
+    else:
+        invalidate_documents(Recipe.objects.filter(tags=instance))
+
+
+@receiver((post_save, pre_delete), sender=Tag)
+def invalidate_tag_documents(sender, instance, **kwargs):
+    invalidate_documents(Recipe.objects.filter(tags=instance))
+
+
+@receiver((post_save, pre_delete), sender=Ingredient)
+def invalidate_ingredient_documents(sender, instance, **kwargs):
+    invalidate_documents(Recipe.objects.filter(
+        recipe_ingredient__ingredient=instance
+    ))
+
+
+@receiver(post_save, sender=UserModel)
+def invalidate_author_documents(sender, instance, created, update_fields,
+                                **kwargs):
+    if created or (update_fields and not AUTHOR_FIELDS & update_fields):
+        return
+    invalidate_documents(Recipe.objects.filter(author=instance))
@@ -0,0 +1,86 @@
+import hashlib
+import os
+import posixpath
+import re
+from uuid import uuid4
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+SHARD_DEPTH = 2
+SHARD_WIDTH = 2
+HASHED_NAME_RE = re.compile(
+    r'(?:^|/)(?:[0-9a-f]{%d}/){%d}(?P<digest>[0-9a-f]{64})(?:\.\w+)?$'
+    % (SHARD_WIDTH, SHARD_DEPTH)
+)
+
+
+def is_hashed_name(name):
+    return HASHED_NAME_RE.search(name) is not None
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    Хранилище, которое называет файлы по SHA-256 их содержимого
+    и раскладывает по вложенным каталогам: ab/cd/abcd….png.
+    Одинаковые файлы сохраняются один раз, а содержимое файла
+    по адресу не меняется, поэтому его можно кэшировать навсегда.
+    Один файл могут использовать несколько объектов: удалять его
+    можно только когда на него никто не ссылается.
+    """
+
+    def hashed_name(self, name, content):
+        digest = hashlib.sha256()
+        for chunk in content.chunks():
+            digest.update(chunk)
+        digest = digest.hexdigest()
+        directory, filename = posixpath.split(name)
+        match = HASHED_NAME_RE.search(name)
+        if match is not None:
+            # Имя уже построено по содержимому (например, при загрузке
+            # выгрузки): каталоги шардов не добавляются повторно.
+            directory = name[:match.start()]
+        shards = [
+            digest[level * SHARD_WIDTH:(level + 1) * SHARD_WIDTH]
+            for level in range(SHARD_DEPTH)
+        ]
+        return posixpath.join(
+            directory, *shards, digest + os.path.splitext(filename)[1].lower()
+        )
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks') or hasattr(
+            content, 'temporary_file_path'
+        ):
+            # Временный файл загрузки копируется, а не перемещается:
+            # его удаляет тот, кто его создал.
+            content = File(content, name)
+        name = self.hashed_name(name, content)
+        if self.exists(name):
+            # Свежая дата изменения защищает файл от сборщика
+            # неиспользуемых файлов, пока ссылка на него не сохранена.
+            os.utime(self.path(name))
+            return name
+        return super().save(name, content, max_length)
+
+    def get_available_name(self, name, max_length=None):
+        # Имя задаётся содержимым: занятое имя означает, что этот
+        # файл уже сохранён, и суффикс к нему не нужен.
+        return name
+
+    def _save(self, name, content):
+        # Файл пишется под временным именем и атомарно
+        # переименовывается: одновременное сохранение того же
+        # содержимого просто заменяет файл таким же, а читатели
+        # не видят недописанный файл.
+        directory, filename = posixpath.split(name)
+        temporary = super()._save(
+            posixpath.join(directory, f'.{filename}.{uuid4().hex}.tmp'),
+            content
+        )
+        os.replace(self.path(temporary), self.path(name))
+        return name
@@ -0,0 +1,353 @@
+import base64
+import io
+import json
+import os
+import shutil
+import tempfile
+import time
+from datetime import timedelta
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.management import CommandError, call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+
+from recipes.management.commands.collect_orphaned_media import Command
+from recipes.media_gc import orphaned_files
+from recipes.models import (Favorites, Ingredient, Recipe, RecipeImport,
+                            RecipeIngredient, ShoppingCart, Tag)
+from recipes.storage import ContentAddressedStorage
+from recipes.trending import update_trending_scores
+
+UserModel = get_user_model()
+
+PNG = base64.b64decode(
+    'iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAADUlEQVR42mNk+M9QDwAD'
+    'hgGAWjR9awAAAABJRU5ErkJggg=='
+)
+
+CONTENT = b'image content'
+HASHED_NAME = (
+    r'^recipes/images/([0-9a-f]{2})/([0-9a-f]{2})/\1\2[0-9a-f]{60}\.png$'
+)
+
+
+class ContentAddressedStorageTest(SimpleTestCase):
+    """Файлы называются по содержимому и сохраняются один раз."""
+
+    def setUp(self):
+        self.location = tempfile.mkdtemp()
+        self.storage = ContentAddressedStorage(location=self.location)
+
+    def tearDown(self):
+        shutil.rmtree(self.location, ignore_errors=True)
+
+    def save(self, name):
+        return self.storage.save(name, ContentFile(CONTENT))
+
+    def test_hashed_name(self):
+        name = self.save('recipes/images/image.PNG')
+        self.assertRegex(name, HASHED_NAME)
+        self.assertTrue(self.storage.exists(name))
+
+    def test_already_hashed_name(self):
+        name = self.save('recipes/images/image.png')
+        self.assertEqual(self.save(name), name)
+        self.assertEqual(self.save(f'other/{name}'), f'other/{name}')
+
+    def test_duplicate_keeps_name(self):
+        name = self.save('recipes/images/image.png')
+        self.storage.exists = lambda name: False
+        self.assertEqual(self.save('recipes/images/copy.png'), name)
+
+
+class Crash(Exception):
+    """Сбой посреди загрузки."""
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+class ImportRecipesTest(TestCase):
+    """Выгрузка и загрузка рецептов с контрольной точкой."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = UserModel.objects.create_user(
+            email='author@example.com', username='author',
+            first_name='Имя', last_name='Фамилия', password='password'
+        )
+        cls.tag = Tag.objects.create(name='Тег', color='#000000', slug='tag')
+        cls.ingredient = Ingredient.objects.create(
+            name='Соль', measurement_unit='г'
+        )
+        for number in range(5):
+            recipe = Recipe.objects.create(
+                author=cls.author, name=f'Рецепт {number}', text='Описание',
+                cooking_time=number + 1,
+                image=ContentFile(PNG, name='image.png'),
+            )
+            recipe.tags.set([cls.tag])
+            RecipeIngredient.objects.create(
+                recipe=recipe, ingredient=cls.ingredient, amount=number + 1
+            )
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(
+            Recipe._meta.get_field('image').storage.location,
+            ignore_errors=True
+        )
+        super().tearDownClass()
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'recipes.jsonl')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def export(self, **options):
+        call_command(
+            'export_recipes', output=self.path, stderr=io.StringIO(),
+            **options
+        )
+        with open(self.path, encoding='utf-8') as source:
+            return [json.loads(line) for line in source]
+
+    def import_recipes(self, **options):
+        call_command(
+            'import_recipes', self.path, batch_size=2,
+            stdout=io.StringIO(), stderr=io.StringIO(), **options
+        )
+
+    def imported(self):
+        return Recipe.objects.exclude(
+            pk__in=[recipe.pk for recipe in self.originals]
+        ).order_by('name')
+
+    def test_round_trip_with_inline_images(self):
+        self.originals = list(Recipe.objects.order_by('name'))
+        lines = self.export(inline_images=True)
+        self.assertTrue(all('content' in line['image'] for line in lines))
+        self.import_recipes()
+        imported = list(self.imported())
+        self.assertEqual(len(imported), len(self.originals))
+        for original, recipe in zip(self.originals, imported):
+            self.assertEqual(
+                (recipe.name, recipe.text, recipe.cooking_time,
+                 recipe.pub_date, recipe.author_id, recipe.image.name),
+                (original.name, original.text, original.cooking_time,
+                 original.pub_date, original.author_id, original.image.name)
+            )
+            self.assertEqual(list(recipe.tags.all()), [self.tag])
+            self.assertEqual(
+                list(recipe.recipe_ingredient.values_list(
+                    'ingredient', 'amount'
+                )),
+                [(self.ingredient.pk, original.cooking_time)]
+            )
+        self.assertTrue(imported[0].image.storage.exists(
+            imported[0].image.name
+        ))
+        self.author.refresh_from_db()
+        self.assertEqual(self.author.recipes_count, 10)
+        self.assertFalse(RecipeImport.objects.exists())
+
+    def test_resume_after_crash(self):
+        self.originals = list(Recipe.objects.all())
+        self.export()
+        update_or_create = RecipeImport.objects.update_or_create
+        calls = []
+
+        def crash_on_second_batch(*args, **kwargs):
+            calls.append(kwargs)
+            if len(calls) == 2:
+                raise Crash
+            return update_or_create(*args, **kwargs)
+
+        with mock.patch.object(
+            RecipeImport.objects, 'update_or_create',
+            side_effect=crash_on_second_batch
+        ):
+            with self.assertRaises(Crash):
+                self.import_recipes()
+        # Вторая пачка откатилась вместе с контрольной точкой.
+        self.assertEqual(self.imported().count(), 2)
+        self.assertEqual(RecipeImport.objects.get().lines, 2)
+        self.import_recipes()
+        self.assertEqual(
+            list(self.imported().values_list('name', flat=True)),
+            [f'Рецепт {number}' for number in range(5)]
+        )
+        self.assertFalse(RecipeImport.objects.exists())
+
+    def test_restart(self):
+        self.originals = list(Recipe.objects.all())
+        self.export()
+        RecipeImport.objects.create(
+            source=os.path.abspath(self.path), lines=4
+        )
+        self.import_recipes()
+        self.assertEqual(self.imported().count(), 1)
+        self.import_recipes(restart=True)
+        self.assertEqual(self.imported().count(), 6)
+
+    def test_empty_file(self):
+        open(self.path, 'w').close()
+        self.import_recipes()
+        self.assertFalse(RecipeImport.objects.exists())
+
+
+@override_settings(TRENDING_HALF_LIFE=60 * 60, TRENDING_WINDOW=10 * 60 * 60)
+class TrendingScoreTest(TestCase):
+    """Популярность за последнее время затухает и выходит из окна."""
+
+    @classmethod
+    def setUpTestData(cls):
+        users = [
+            UserModel.objects.create_user(
+                email=f'user{number}@example.com', username=f'user{number}',
+                first_name='Имя', last_name='Фамилия', password='password'
+            )
+            for number in range(2)
+        ]
+        cls.recipes = [
+            Recipe.objects.create(
+                author=users[0], name=f'Рецепт {number}', text='Описание',
+                cooking_time=1, image='recipes/images/image.png'
+            )
+            for number in range(3)
+        ]
+        cls.now = timezone.now()
+        for user in users:
+            Favorites.objects.create(user=user, recipe=cls.recipes[0])
+        ShoppingCart.objects.create(user=users[0], recipe=cls.recipes[1])
+        Favorites.objects.update(created=cls.now)
+        ShoppingCart.objects.update(created=cls.now)
+
+    def scores(self, hours):
+        updated = update_trending_scores(self.now + timedelta(hours=hours))
+        return updated, [
+            round(score, 6) for score in Recipe.objects.order_by(
+                'name'
+            ).values_list('trending_score', flat=True)
+        ]
+
+    def test_recompute(self):
+        self.assertEqual(self.scores(0), (2, [2.0, 0.5, 0.0]))
+        # Повторный пересчёт не накапливает счёт.
+        self.assertEqual(self.scores(0), (2, [2.0, 0.5, 0.0]))
+
+    def test_decay(self):
+        self.assertEqual(self.scores(1), (2, [1.0, 0.25, 0.0]))
+        self.assertEqual(self.scores(2), (2, [0.5, 0.125, 0.0]))
+
+    def test_window(self):
+        Favorites.objects.filter(recipe=self.recipes[0]).update(
+            created=self.now - timedelta(hours=6)
+        )
+        self.scores(0)
+        self.assertEqual(self.scores(5), (2, [0.0, 0.015625, 0.0]))
+        self.assertEqual(self.scores(11), (1, [0.0, 0.0, 0.0]))
+        # Рецепты с нулевым счётом больше не обновляются.
+        self.assertEqual(self.scores(12), (0, [0.0, 0.0, 0.0]))
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+class OrphanedMediaTest(TestCase):
+    """Сборка файлов, на которые не ссылается ни одна модель."""
+
+    def setUp(self):
+        self.media_root = settings.MEDIA_ROOT
+        self.quarantine = tempfile.mkdtemp()
+        author = UserModel.objects.create_user(
+            email='author@example.com', username='author',
+            first_name='Имя', last_name='Фамилия', password='password'
+        )
+        self.recipe = Recipe.objects.create(
+            author=author, name='Рецепт', text='Описание', cooking_time=1,
+            image=ContentFile(PNG, name='image.png'),
+        )
+        self.old = time.time() - 2 * 60 * 60
+        os.utime(self.path(self.recipe.image.name), (self.old, self.old))
+        self.orphans = [
+            self.create('recipes/images/00/00/orphan.png'),
+            self.create('shopping_lists/orphan.pdf'),
+        ]
+        self.fresh = self.create('recipes/images/fresh.png', age=0)
+        self.other = self.create('other/orphan.txt')
+
+    def tearDown(self):
+        shutil.rmtree(self.media_root, ignore_errors=True)
+        shutil.rmtree(self.quarantine, ignore_errors=True)
+
+    def path(self, name):
+        return os.path.join(self.media_root, name)
+
+    def create(self, name, age=2 * 60 * 60):
+        path = self.path(name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as file:
+            file.write(CONTENT)
+        mtime = time.time() - age
+        os.utime(path, (mtime, mtime))
+        return path
+
+    def collect(self, **options):
+        stdout = io.StringIO()
+        options.setdefault('grace_hours', 1)
+        call_command('collect_orphaned_media', stdout=stdout, **options)
+        return stdout.getvalue()
+
+    def existing(self):
+        return [
+            path for path in (
+                *self.orphans, self.fresh, self.other,
+                self.path(self.recipe.image.name)
+            )
+            if os.path.exists(path)
+        ]
+
+    def test_orphaned_files(self):
+        for batch_size in (1, 500):
+            with self.subTest(batch_size=batch_size):
+                self.assertCountEqual(
+                    orphaned_files(60 * 60, batch_size),
+                    [(path, len(CONTENT)) for path in self.orphans]
+                )
+
+    def test_grace_period(self):
+        self.assertEqual(list(orphaned_files(3 * 60 * 60)), [])
+        self.collect(grace_hours=3)
+        self.assertEqual(len(self.existing()), 5)
+
+    def test_dry_run(self):
+        output = self.collect(dry_run=True)
+        for path in self.orphans:
+            self.assertIn(path, output)
+        self.assertEqual(len(self.existing()), 5)
+
+    def test_delete(self):
+        self.collect()
+        self.assertCountEqual(self.existing(), [
+            self.fresh, self.other, self.path(self.recipe.image.name)
+        ])
+
+    def test_quarantine(self):
+        self.collect(quarantine=self.quarantine)
+        self.assertEqual(len(self.existing()), 3)
+        for path in self.orphans:
+            self.assertTrue(os.path.exists(os.path.join(
+                self.quarantine, os.path.relpath(path, self.media_root)
+            )))
+        with self.assertRaises(CommandError):
+            self.collect(quarantine=self.path('quarantine'))
+
+    def test_file_touched_after_scan(self):
+        # Файл переиспользовали между проверкой ссылок и удалением.
+        path = self.orphans[0]
+        os.utime(path)
+        self.assertFalse(Command.collect(path, 60 * 60, None))
+        self.assertTrue(os.path.exists(path))
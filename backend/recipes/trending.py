@@ -0,0 +1,69 @@
+import math
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import (FloatField, Func, OuterRef, Q, Subquery, Sum,
+                              Value)
+from django.db.models.functions import Coalesce, Exp
+from django.utils import timezone
+
+from recipes.models import Favorites, Recipe, ShoppingCart
+
+TRENDING_SOURCES = (
+    (Favorites, 1.0),
+    (ShoppingCart, 0.5),
+)
+
+
+class Epoch(Func):
+    """Дата и время в секундах с начала эпохи Unix."""
+
+    template = 'EXTRACT(EPOCH FROM %(expressions)s)'
+    output_field = FloatField()
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        return super().as_sql(
+            compiler, connection,
+            template='((julianday(%(expressions)s) - 2440587.5) * 86400.0)',
+            **extra_context
+        )
+
+
+def score_subquery(model, weight, now, since):
+    """
+    Сумма весов добавлений рецепта за окно TRENDING_WINDOW,
+    каждое из которых затухает вдвое за TRENDING_HALF_LIFE.
+    """
+    decay = math.log(2) / settings.TRENDING_HALF_LIFE
+    return Coalesce(
+        Subquery(
+            model.objects.filter(
+                recipe=OuterRef('pk'), created__gte=since
+            ).order_by().values('recipe').annotate(
+                score=Value(weight) * Sum(Exp(
+                    (Epoch('created') - Value(now.timestamp()))
+                    * Value(decay)
+                ))
+            ).values('score'),
+            output_field=FloatField()
+        ),
+        Value(0.0)
+    )
+
+
+def update_trending_scores(now=None):
+    """
+    Пересчитывает trending_score одним UPDATE. Затрагиваются только
+    рецепты со свежими добавлениями и рецепты с ненулевым счётом,
+    у которых он должен обнулиться. Возвращает число рецептов.
+    """
+    now = now or timezone.now()
+    since = now - timedelta(seconds=settings.TRENDING_WINDOW)
+    affected = Q(trending_score__gt=0)
+    score = Value(0.0)
+    for model, weight in TRENDING_SOURCES:
+        affected |= Q(pk__in=model.objects.filter(
+            created__gte=since
+        ).values('recipe'))
+        score = score + score_subquery(model, weight, now, since)
+    return Recipe.objects.filter(affected).update(trending_score=score)
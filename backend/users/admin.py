@@ -3,7 +3,8 @@ from django.contrib.auth import get_user_model
 from django.contrib.auth.admin import UserAdmin as UserAdminModel
 from django.contrib.auth.models import Group
 
-from users.models import Subscription
+from users.models import AccountPurge, Subscription
+from users.purge import start_purge
 
 UserModel = get_user_model()
 
@@ -21,10 +22,29 @@ class UserAdmin(UserAdminModel):
         'is_active',
         'first_name',
         'last_name',
+        'recipes_count',
+        'followers_count',
+        'subscriptions_count',
     )
     search_fields = ('username', 'email')
     empty_value_display = '-пусто-'
 
+    def get_deleted_objects(self, objs, request):
+        users = list(objs)
+        return (
+            [str(user) for user in users],
+            {self.model._meta.verbose_name_plural: len(users)},
+            set(),
+            [],
+        )
+
+    def delete_model(self, request, obj):
+        start_purge(obj)
+
+    def delete_queryset(self, request, queryset):
+        for user in queryset:
+            start_purge(user)
+
 
 @admin.register(Subscription)
 class SubscriptionAdmin(admin.ModelAdmin):
@@ -34,5 +54,29 @@ class SubscriptionAdmin(admin.ModelAdmin):
         'user',
         'subscription'
     )
-    search_fields = ('user',)
+    list_select_related = ('user', 'subscription')
+    search_fields = ('^user__username', '^subscription__username')
+    autocomplete_fields = ('user', 'subscription')
+    show_full_result_count = False
     empty_value_display = '-пусто-'
+
+
+@admin.register(AccountPurge)
+class AccountPurgeAdmin(admin.ModelAdmin):
+    """Административный класс для просмотра удалений аккаунтов."""
+
+    list_display = (
+        'email',
+        'status',
+        'recipes_deleted',
+        'recipes_total',
+        'updated'
+    )
+    list_filter = ('status',)
+    search_fields = ('^email',)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
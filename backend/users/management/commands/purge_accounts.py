@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from users.models import AccountPurge
+from users.purge import BATCH_SIZE, abandoned, run_purge
+
+
+class Command(BaseCommand):
+    help = (
+        'Завершает упавшие и брошенные удаления аккаунтов. Удаления, '
+        'которые сейчас выполняет воркер, пропускаются.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        completed = 0
+        for purge in AccountPurge.objects.filter(abandoned()):
+            self.stdout.write(f'Удаление аккаунта {purge.email}')
+            status = run_purge(purge.pk, options['batch_size'])
+            if status is None:
+                self.stdout.write('  уже выполняется, пропущено')
+            elif status == AccountPurge.FAILED:
+                self.stderr.write('  ошибка, подробности в журнале')
+            else:
+                completed += 1
+        self.stdout.write(f'Завершено удалений: {completed}')
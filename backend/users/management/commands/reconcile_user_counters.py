@@ -0,0 +1,74 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from recipes.models import Recipe
+from users.models import Subscription
+
+UserModel = get_user_model()
+
+BATCH_SIZE = 1000
+
+COUNTERS = (
+    ('recipes_count', Recipe, 'author'),
+    ('followers_count', Subscription, 'subscription'),
+    ('subscriptions_count', Subscription, 'user'),
+)
+
+
+def count_subquery(model, field):
+    return Coalesce(
+        Subquery(
+            model.objects.filter(
+                **{field: OuterRef('pk')}
+            ).order_by().values(field).annotate(
+                count=Count('pk')
+            ).values('count'),
+            output_field=IntegerField()
+        ),
+        0
+    )
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает счётчики рецептов и подписок пользователей.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        fields = [field for field, _, _ in COUNTERS]
+        annotations = {
+            f'actual_{field}': count_subquery(model, related)
+            for field, model, related in COUNTERS
+        }
+        last_pk = 0
+        fixed = 0
+        while True:
+            with transaction.atomic():
+                users = list(
+                    UserModel.objects.filter(pk__gt=last_pk).order_by(
+                        'pk'
+                    ).select_for_update().only(
+                        'pk', *fields
+                    ).annotate(**annotations)[:batch_size]
+                )
+                if not users:
+                    break
+                drifted = []
+                for user in users:
+                    changed = False
+                    for field in fields:
+                        actual = getattr(user, f'actual_{field}')
+                        if getattr(user, field) != actual:
+                            setattr(user, field, actual)
+                            changed = True
+                    if changed:
+                        drifted.append(user)
+                UserModel.objects.bulk_update(drifted, fields)
+            fixed += len(drifted)
+            last_pk = users[-1].pk
+        self.stdout.write(f'Исправлено пользователей: {fixed}')
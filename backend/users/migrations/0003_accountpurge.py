@@ -0,0 +1,31 @@
+# Generated by Django 3.2.3 on 2026-10-19 09:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0002_foodgramuser_counters'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AccountPurge',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('user_id', models.BigIntegerField(unique=True, verbose_name='ID пользователя')),
+                ('email', models.EmailField(max_length=254, verbose_name='Адрес электронной почты')),
+                ('status', models.CharField(choices=[('pending', 'В очереди'), ('running', 'Выполняется'), ('done', 'Готово'), ('failed', 'Ошибка')], default='pending', max_length=16, verbose_name='Статус')),
+                ('recipes_total', models.PositiveIntegerField(default=0, verbose_name='Всего рецептов')),
+                ('recipes_deleted', models.PositiveIntegerField(default=0, verbose_name='Удалено рецептов')),
+                ('created', models.DateTimeField(auto_now_add=True, verbose_name='Дата создания')),
+                ('updated', models.DateTimeField(auto_now=True, verbose_name='Дата обновления')),
+            ],
+            options={
+                'verbose_name': 'удаление аккаунта',
+                'verbose_name_plural': 'Удаления аккаунтов',
+                'ordering': ('-created',),
+            },
+        ),
+    ]
@@ -0,0 +1,56 @@
+from django.db import migrations
+
+SEARCH_COLUMNS = ('username', 'first_name', 'last_name')
+TABLE = 'users_foodgramuser'
+
+
+def trigram_available(schema_editor):
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm'"
+        )
+        return cursor.fetchone() is not None
+
+
+def create_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    # Поиск по началу поля (istartswith).
+    for column in SEARCH_COLUMNS:
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS {TABLE}_{column}_upper_idx '
+            f'ON {TABLE} (UPPER({column}::text) text_pattern_ops)'
+        )
+    # Поиск по подстроке (icontains). Без расширения pg_trgm
+    # подстрока ищется последовательным просмотром таблицы.
+    if not trigram_available(schema_editor):
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for column in SEARCH_COLUMNS:
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS {TABLE}_{column}_trgm_idx '
+            f'ON {TABLE} USING gin (UPPER({column}::text) gin_trgm_ops)'
+        )
+
+
+def drop_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for column in SEARCH_COLUMNS:
+        schema_editor.execute(
+            f'DROP INDEX IF EXISTS {TABLE}_{column}_upper_idx'
+        )
+        schema_editor.execute(
+            f'DROP INDEX IF EXISTS {TABLE}_{column}_trgm_idx'
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0003_accountpurge'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_indexes, drop_indexes),
+    ]
@@ -4,6 +4,7 @@ from django.db import models
 
 EMAIL_MAX_LENGTH = 254
 STRING_MAX_LENGTH = 150
+COUNTER_FIELDS = ('recipes_count', 'followers_count', 'subscriptions_count')
 
 
 class FoodgramUser(AbstractUser):
@@ -23,6 +24,21 @@ class FoodgramUser(AbstractUser):
     password = models.CharField('Пароль', max_length=STRING_MAX_LENGTH)
     first_name = models.CharField('Имя', max_length=STRING_MAX_LENGTH)
     last_name = models.CharField('Фамилия', max_length=STRING_MAX_LENGTH)
+    recipes_count = models.PositiveIntegerField(
+        'Количество рецептов',
+        default=0,
+        editable=False
+    )
+    followers_count = models.PositiveIntegerField(
+        'Количество подписчиков',
+        default=0,
+        editable=False
+    )
+    subscriptions_count = models.PositiveIntegerField(
+        'Количество подписок',
+        default=0,
+        editable=False
+    )
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ['username', 'first_name', 'last_name']
 
@@ -31,6 +47,26 @@ class FoodgramUser(AbstractUser):
         verbose_name_plural = 'Пользователи'
         ordering = ('date_joined', 'username')
 
+    def save(self, *args, **kwargs):
+        """
+        Счётчики меняются только запросами UPDATE с F() и при сохранении
+        пользователя не записываются: иначе значения, прочитанные при
+        загрузке, затёрли бы изменения, сделанные после неё.
+        """
+        if not self._state.adding and not kwargs.get('force_insert'):
+            update_fields = kwargs.get('update_fields')
+            if update_fields is None:
+                deferred = self.get_deferred_fields()
+                update_fields = [
+                    field.name for field in self._meta.concrete_fields
+                    if not field.primary_key
+                    and field.attname not in deferred
+                ]
+            kwargs['update_fields'] = [
+                name for name in update_fields if name not in COUNTER_FIELDS
+            ]
+        super().save(*args, **kwargs)
+
 
 class Subscription(models.Model):
     """Модель подписок."""
@@ -66,3 +102,45 @@ class Subscription(models.Model):
         return (
             f'{self.user.username} на {self.subscription.username}'
         )
+
+
+class AccountPurge(models.Model):
+    """Модель фонового удаления аккаунта пользователя."""
+
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUSES = (
+        (PENDING, 'В очереди'),
+        (RUNNING, 'Выполняется'),
+        (DONE, 'Готово'),
+        (FAILED, 'Ошибка'),
+    )
+
+    user_id = models.BigIntegerField('ID пользователя', unique=True)
+    email = models.EmailField(
+        'Адрес электронной почты',
+        max_length=EMAIL_MAX_LENGTH
+    )
+    status = models.CharField(
+        'Статус',
+        max_length=16,
+        choices=STATUSES,
+        default=PENDING
+    )
+    recipes_total = models.PositiveIntegerField('Всего рецептов', default=0)
+    recipes_deleted = models.PositiveIntegerField(
+        'Удалено рецептов',
+        default=0
+    )
+    created = models.DateTimeField('Дата создания', auto_now_add=True)
+    updated = models.DateTimeField('Дата обновления', auto_now=True)
+
+    class Meta:
+        verbose_name = 'удаление аккаунта'
+        verbose_name_plural = 'Удаления аккаунтов'
+        ordering = ('-created',)
+
+    def __str__(self):
+        return f'{self.email} ({self.get_status_display()})'
@@ -0,0 +1,153 @@
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+
+from foodgram.background import submit
+from recipes.models import (Favorites, Recipe, RecipeDocument,
+                            RecipeIngredient, ShoppingCart)
+from users.models import AccountPurge, FoodgramUser, Subscription
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 500
+
+
+def raw_delete(queryset):
+    """
+    Удаляет строки одним DELETE без загрузки объектов,
+    каскадов и сигналов.
+    """
+    return queryset._raw_delete(queryset.db)
+
+
+@transaction.atomic
+def delete_user_links(user_id):
+    """
+    Удаляет избранное, список покупок и подписки пользователя,
+    поправляя счётчики затронутых рецептов и авторов.
+    """
+    Recipe.objects.filter(
+        pk__in=Favorites.objects.filter(user_id=user_id).values('recipe'),
+        favorites_count__gt=0
+    ).update(favorites_count=F('favorites_count') - 1)
+    FoodgramUser.objects.filter(
+        pk__in=Subscription.objects.filter(
+            user_id=user_id
+        ).values('subscription'),
+        followers_count__gt=0
+    ).update(followers_count=F('followers_count') - 1)
+    FoodgramUser.objects.filter(
+        pk__in=Subscription.objects.filter(
+            subscription_id=user_id
+        ).values('user'),
+        subscriptions_count__gt=0
+    ).update(subscriptions_count=F('subscriptions_count') - 1)
+    raw_delete(Favorites.objects.filter(user_id=user_id))
+    raw_delete(ShoppingCart.objects.filter(user_id=user_id))
+    raw_delete(Subscription.objects.filter(
+        Q(user_id=user_id) | Q(subscription_id=user_id)
+    ))
+
+
+def delete_recipes_batch(purge, batch_size):
+    """
+    Удаляет очередную пачку рецептов пользователя со всеми
+    связанными строками и возвращает число удалённых рецептов.
+    """
+    with transaction.atomic():
+        recipe_ids = list(Recipe.objects.filter(
+            author_id=purge.user_id
+        ).order_by('pk').values_list('pk', flat=True)[:batch_size])
+        if not recipe_ids:
+            return 0
+        for model in (RecipeIngredient, Favorites, ShoppingCart,
+                      RecipeDocument, Recipe.tags.through):
+            raw_delete(model.objects.filter(recipe_id__in=recipe_ids))
+        raw_delete(Recipe.objects.filter(pk__in=recipe_ids))
+        AccountPurge.objects.filter(pk=purge.pk).update(
+            recipes_deleted=F('recipes_deleted') + len(recipe_ids),
+            updated=timezone.now()
+        )
+    return len(recipe_ids)
+
+
+def purge_account(purge, batch_size=BATCH_SIZE):
+    """
+    Удаляет аккаунт пачками. Операция идемпотентна: после сбоя
+    её можно запустить повторно, и она продолжит с того же места.
+    Файлы изображений не удаляются: один файл может понадобиться
+    параллельной загрузке того же изображения, ещё не сохранившей
+    рецепт. Осиротевшие файлы по истечении периода ожидания удаляет
+    команда collect_orphaned_media.
+    """
+    AccountPurge.objects.filter(pk=purge.pk).update(
+        recipes_total=F('recipes_deleted') + Recipe.objects.filter(
+            author_id=purge.user_id
+        ).count(),
+        updated=timezone.now()
+    )
+    delete_user_links(purge.user_id)
+    while delete_recipes_batch(purge, batch_size):
+        pass
+    FoodgramUser.objects.filter(pk=purge.user_id).delete()
+
+
+def abandoned():
+    """
+    Удаления, которые никто не выполняет: упавшие, а также
+    в очереди или в работе без движения дольше ACCOUNT_PURGE_TIMEOUT
+    (пул потоков живёт в процессе воркера и пропадает вместе с ним).
+    """
+    stale = timezone.now() - timedelta(
+        seconds=settings.ACCOUNT_PURGE_TIMEOUT
+    )
+    return Q(status=AccountPurge.FAILED) | Q(
+        status__in=(AccountPurge.PENDING, AccountPurge.RUNNING),
+        updated__lt=stale,
+    )
+
+
+def run_purge(pk, batch_size=BATCH_SIZE):
+    """
+    Выполняет удаление, если его удалось занять: оно в очереди
+    или брошено. Возвращает итоговый статус или None, если
+    удаление уже выполняется или завершено.
+    """
+    if not AccountPurge.objects.filter(
+        Q(status=AccountPurge.PENDING) | abandoned(), pk=pk
+    ).update(status=AccountPurge.RUNNING, updated=timezone.now()):
+        return None
+    purge = AccountPurge.objects.get(pk=pk)
+    try:
+        purge_account(purge, batch_size)
+    except Exception:
+        logger.exception('Ошибка удаления аккаунта %s', purge.email)
+        AccountPurge.objects.filter(pk=pk).update(
+            status=AccountPurge.FAILED, updated=timezone.now()
+        )
+        return AccountPurge.FAILED
+    AccountPurge.objects.filter(pk=pk).update(
+        status=AccountPurge.DONE, updated=timezone.now()
+    )
+    return AccountPurge.DONE
+
+
+@transaction.atomic
+def start_purge(user):
+    """
+    Блокирует пользователя и ставит удаление его аккаунта
+    в фоновую очередь.
+    """
+    FoodgramUser.objects.filter(pk=user.pk).update(is_active=False)
+    Token.objects.filter(user=user).delete()
+    purge, _ = AccountPurge.objects.update_or_create(
+        user_id=user.pk,
+        defaults={'email': user.email, 'status': AccountPurge.PENDING}
+    )
+    transaction.on_commit(lambda: submit(run_purge, purge.pk))
+    return purge
@@ -0,0 +1,28 @@
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from users.models import FoodgramUser, Subscription
+
+
+@receiver(post_save, sender=Subscription)
+def increment_subscription_counters(sender, instance, created, raw=False,
+                                    **kwargs):
+    if not created or raw:
+        return
+    FoodgramUser.objects.filter(pk=instance.user_id).update(
+        subscriptions_count=F('subscriptions_count') + 1
+    )
+    FoodgramUser.objects.filter(pk=instance.subscription_id).update(
+        followers_count=F('followers_count') + 1
+    )
+
+
+@receiver(post_delete, sender=Subscription)
+def decrement_subscription_counters(sender, instance, **kwargs):
+    FoodgramUser.objects.filter(
+        pk=instance.user_id, subscriptions_count__gt=0
+    ).update(subscriptions_count=F('subscriptions_count') - 1)
+    FoodgramUser.objects.filter(
+        pk=instance.subscription_id, followers_count__gt=0
+    ).update(followers_count=F('followers_count') - 1)
@@ -0,0 +1,164 @@
+import base64
+import io
+import shutil
+import tempfile
+from datetime import timedelta
+from unittest import mock
+
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from recipes.models import Recipe
+from users.models import AccountPurge, FoodgramUser, Subscription
+from users.purge import run_purge
+
+MEDIA_ROOT = tempfile.mkdtemp()
+PNG = base64.b64decode(
+    'iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAADUlEQVR42mNk+M9QDwAD'
+    'hgGAWjR9awAAAABJRU5ErkJggg=='
+)
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class UserCountersTest(TestCase):
+    """Сохранение пользователя не затирает счётчики."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author, cls.follower = (
+            FoodgramUser.objects.create_user(
+                email=f'{name}@example.com', username=name,
+                first_name=name, last_name=name, password='password'
+            )
+            for name in ('author', 'follower')
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def add_activity(self):
+        for number in range(3):
+            Recipe.objects.create(
+                author=self.author, name=f'Рецепт {number}', text='Текст',
+                cooking_time=1, image=ContentFile(PNG, name='image.png')
+            )
+        Subscription.objects.create(
+            user=self.follower, subscription=self.author
+        )
+
+    def assert_counters(self):
+        self.author.refresh_from_db()
+        self.follower.refresh_from_db()
+        self.assertEqual(self.author.recipes_count, 3)
+        self.assertEqual(self.author.followers_count, 1)
+        self.assertEqual(self.follower.subscriptions_count, 1)
+
+    def test_save_keeps_counters(self):
+        author = FoodgramUser.objects.get(pk=self.author.pk)
+        follower = FoodgramUser.objects.get(pk=self.follower.pk)
+        self.add_activity()
+        author.first_name = 'Новое имя'
+        author.save()
+        follower.save()
+        self.assert_counters()
+        self.assertEqual(self.author.first_name, 'Новое имя')
+
+    def test_save_with_update_fields_keeps_counters(self):
+        author = FoodgramUser.objects.get(pk=self.author.pk)
+        self.add_activity()
+        author.save(update_fields=('first_name', 'recipes_count'))
+        self.assert_counters()
+
+    def test_set_password_keeps_counters(self):
+        client = APIClient()
+        client.force_authenticate(self.author)
+        self.add_activity()
+        response = client.post('/api/users/set_password/', {
+            'current_password': 'password', 'new_password': 'n3w-Passw0rd'
+        })
+        self.assertEqual(response.status_code, 204)
+        self.assert_counters()
+        self.assertTrue(self.author.check_password('n3w-Passw0rd'))
+
+
+@override_settings(ACCOUNT_PURGE_TIMEOUT=600, MEDIA_ROOT=MEDIA_ROOT)
+class PurgeAccountsCommandTest(TestCase):
+    """Команда не трогает удаления, которые выполняет воркер."""
+
+    def create_purge(self, status, minutes_ago):
+        user = FoodgramUser.objects.create_user(
+            email=f'{status}{minutes_ago}@example.com',
+            username=f'{status}{minutes_ago}',
+            first_name='Имя', last_name='Фамилия', password='password'
+        )
+        purge = AccountPurge.objects.create(
+            user_id=user.pk, email=user.email, status=status
+        )
+        AccountPurge.objects.filter(pk=purge.pk).update(
+            updated=timezone.now() - timedelta(minutes=minutes_ago)
+        )
+        return purge
+
+    def test_only_abandoned_purges(self):
+        live = [
+            self.create_purge(AccountPurge.PENDING, 1),
+            self.create_purge(AccountPurge.RUNNING, 1),
+        ]
+        abandoned = [
+            self.create_purge(AccountPurge.FAILED, 1),
+            self.create_purge(AccountPurge.PENDING, 30),
+            self.create_purge(AccountPurge.RUNNING, 30),
+        ]
+        call_command('purge_accounts', stdout=io.StringIO())
+        for purge, status in (
+            *((purge, purge.status) for purge in live),
+            *((purge, AccountPurge.DONE) for purge in abandoned),
+        ):
+            with self.subTest(status=purge.status, email=purge.email):
+                purge.refresh_from_db()
+                self.assertEqual(purge.status, status)
+                self.assertEqual(
+                    FoodgramUser.objects.filter(pk=purge.user_id).exists(),
+                    status != AccountPurge.DONE
+                )
+
+    def test_images_left_to_media_collector(self):
+        purge = self.create_purge(AccountPurge.PENDING, 1)
+        recipe = Recipe.objects.create(
+            author_id=purge.user_id, name='Рецепт', text='Текст',
+            cooking_time=1, image=ContentFile(PNG, name='image.png')
+        )
+        self.assertEqual(run_purge(purge.pk), AccountPurge.DONE)
+        self.assertFalse(Recipe.objects.exists())
+        # Тот же файл может сохранять параллельная загрузка.
+        self.assertTrue(recipe.image.storage.exists(recipe.image.name))
+
+
+class UserSearchTest(TestCase):
+    """При большом числе совпадений в выдачу попадают лучшие."""
+
+    @classmethod
+    def setUpTestData(cls):
+        for username, first_name, last_name in (
+            ('anna', 'Anna', 'Mivanova'), ('boris', 'Boris', 'Mivanov'),
+            ('vera', 'Vera', 'Ivanova'), ('oleg', 'Ivan', 'Petrov'),
+        ):
+            FoodgramUser.objects.create_user(
+                email=f'{username}@example.com', username=username,
+                first_name=first_name, last_name=last_name,
+                password='password'
+            )
+
+    @mock.patch('api.filters.USER_SEARCH_MAX_MATCHES', 2)
+    def test_best_matches_kept(self):
+        response = APIClient().get('/api/users/', {'search': 'ivan'})
+        self.assertEqual(response.json()['count'], 2)
+        self.assertEqual(
+            [user['username'] for user in response.json()['results']],
+            ['oleg', 'vera']
+        )